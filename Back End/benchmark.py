@@ -0,0 +1,292 @@
+"""Benchmark harness for the pathway engine.
+
+Drives compute_pathway() directly ("engine") and the FastAPI app in-process or
+a running server ("http") over a fixed, seeded sample of occupation pairs from
+detailed_occupations.json, and reports throughput, p50/p95/p99 latency and peak
+RSS, single-threaded and with N concurrent clients.
+
+By default the deterministic HashingEncoder stands in for the
+SentenceTransformer, so it runs with no network or GPU. Results are written as
+JSON and can be compared against a previous run to catch hot-path regressions:
+
+    python benchmark.py --out bench.json
+    python benchmark.py --compare bench.json --max-regression 0.15
+
+--mode index instead measures the skill index alone: recall@300 of the ivf and
+hnsw indexes against exact flat search, and search latency for the pathway's
+two-query batch, over every occupation embedding:
+
+    python benchmark.py --mode index --nprobe 4 16 64 --ef-search 64 128 256
+
+Run from the Back End directory (it needs the same data files as the server).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from encoder import ENCODER_BACKENDS
+from skill_index import build_skill_index, configure_search, describe
+
+
+def sample_pairs(count, seed):
+    with open("detailed_occupations.json", "r", encoding="utf-8") as f:
+        titles = [job["SOC Title"] for job in json.load(f)]
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < count:
+        job1, job2 = rng.sample(titles, 2)
+        pairs.append((job1, job2))
+    return pairs
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, None where it cannot be measured."""
+    try:
+        # Unix only
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memory = psutil.Process().memory_info()
+        # peak_wset is the Windows peak working set, elsewhere only the current RSS is known
+        return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies, wall_seconds):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        k = (len(latencies) - 1) * p / 100
+        lower = int(k)
+        upper = min(lower + 1, len(latencies) - 1)
+        return latencies[lower] + (latencies[upper] - latencies[lower]) * (k - lower)
+
+    rss = peak_rss_mb()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+        "p50_ms": round(percentile(50) * 1000, 3),
+        "p95_ms": round(percentile(95) * 1000, 3),
+        "p99_ms": round(percentile(99) * 1000, 3),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+
+def bench_engine(pairs, concurrency):
+    import main
+
+    def one(pair):
+        start = time.perf_counter()
+        main.compute_pathway(*pair)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [one(pair) for pair in pairs]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(one, pairs))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def _bench_http(pairs, concurrency, url):
+    import httpx
+
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=300)
+        lifespan = contextlib.nullcontext()
+    else:
+        import main
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=300)
+        # ASGITransport does not run the lifespan, and until its warm-up is done
+        # the pathway endpoints only answer 503
+        lifespan = main.app.router.lifespan_context(main.app)
+
+    queue = list(pairs)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            job1, job2 = queue.pop()
+            start = time.perf_counter()
+            response = await client.get(f"/pathway/{job1}/{job2}")
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    async with lifespan, client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        result = summarize(latencies, time.perf_counter() - start)
+    result["errors"] = errors
+    return result
+
+
+def bench_http(pairs, concurrency, url=None):
+    return asyncio.run(_bench_http(pairs, concurrency, url))
+
+
+def bench_index(nprobes, ef_searches, k=300):
+    """Recall@k against flat and latency of two-query searches, per index configuration."""
+    import main
+
+    catalog = main.get_catalog()
+    queries = np.ascontiguousarray(catalog.job_embeddings, dtype=np.float32)
+    pairs = [queries[row:row + 2] for row in range(0, len(queries) - 1, 2)]
+    results = {}
+    exact = None
+    configs = [("flat", {})]
+    configs += [("ivf", {"nprobe": nprobe}) for nprobe in nprobes]
+    configs += [("hnsw", {"ef_search": ef_search}) for ef_search in ef_searches]
+    built = {}
+    for kind, params in configs:
+        if kind not in built:
+            start = time.perf_counter()
+            built[kind] = (build_skill_index(catalog.skill_embeddings, kind), time.perf_counter() - start)
+        index, build_seconds = built[kind]
+        configure_search(index, **params)
+
+        latencies = []
+        start = time.perf_counter()
+        for pair in pairs:
+            query_start = time.perf_counter()
+            index.search(pair, k)
+            latencies.append(time.perf_counter() - query_start)
+        result = summarize(latencies, time.perf_counter() - start)
+
+        _, found = index.search(queries, k)
+        if exact is None:
+            exact = found
+        recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(exact, found)])
+        result.update({"index": describe(index), f"recall_at_{k}": round(float(recall), 4), "build_seconds": round(build_seconds, 3)})
+        results["index_" + describe(index).replace(" ", "_")] = result
+    return results
+
+
+def prepare_engine():
+    """Load the catalog and the course embeddings (only saved if --encoder is the reference fp32 one)."""
+    import main
+
+    start = time.perf_counter()
+    main.get_catalog().get_course_embeddings(main.get_model)
+    return time.perf_counter() - start
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print per-scenario p50/throughput deltas, return False on a regression or
+    when a scenario had failed requests (their latencies are not comparable)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')}):")
+    for scenario, current in results["scenarios"].items():
+        if current.get("errors"):
+            ok = False
+            print(f"  {scenario:<24} {current['errors']} of {current['requests']} requests failed  ERRORS")
+            continue
+        previous = baseline["scenarios"].get(scenario)
+        if not previous or not previous["p50_ms"]:
+            continue
+        p50_change = current["p50_ms"] / previous["p50_ms"] - 1
+        rps_change = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        regressed = p50_change > max_regression
+        ok = ok and not regressed
+        print(f"  {scenario:<24} p50 {p50_change:+.1%}  throughput {rps_change:+.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pathway engine")
+    parser.add_argument("--pairs", type=int, default=20, help="number of sampled occupation pairs")
+    parser.add_argument("--seed", type=int, default=404)
+    parser.add_argument("--concurrency", type=int, default=4, help="clients for the concurrent runs")
+    parser.add_argument("--mode", choices=["engine", "http", "both", "index"], default="both")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default="hashing", help="PATHWAY_ENCODER for the run (default: hashing stub)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="ivf settings for --mode index")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[64, 128, 256], help="hnsw settings for --mode index")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed p50 slowdown vs --compare")
+    args = parser.parse_args(argv)
+
+    os.environ["PATHWAY_ENCODER"] = args.encoder
+    # every HTTP request should exercise the computation, not the result cache
+    os.environ.setdefault("PATHWAY_CACHE_SIZE", "0")
+    # the in-process app only serves pathways once its warm-up is done
+    os.environ.setdefault("PATHWAY_WARMUP", "blocking")
+    pairs = sample_pairs(args.pairs, args.seed)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "encoder": args.encoder,
+            "encoder_threads": os.environ.get("PATHWAY_ENCODER_THREADS"),
+            "pairs": args.pairs,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+    if not args.url:
+        results["meta"]["warmup_seconds"] = round(prepare_engine(), 3)
+
+    scenarios = []
+    if args.mode in ("engine", "both") and not args.url:
+        scenarios += [("engine_single", lambda: bench_engine(pairs, 1)),
+                      (f"engine_x{args.concurrency}", lambda: bench_engine(pairs, args.concurrency))]
+    if args.mode in ("http", "both"):
+        scenarios += [("http_single", lambda: bench_http(pairs, 1, args.url)),
+                      (f"http_x{args.concurrency}", lambda: bench_http(pairs, args.concurrency, args.url))]
+
+    for name, run in scenarios:
+        results["scenarios"][name] = run()
+    if args.mode == "index":
+        results["scenarios"].update(bench_index(args.nprobe, args.ef_search))
+
+    for name, r in results["scenarios"].items():
+        recall = f"  recall {r['recall_at_300']:.3f}" if "recall_at_300" in r else ""
+        errors = f"  errors {r['errors']}" if r.get("errors") else ""
+        rss = f"{r['peak_rss_mb']:.0f} MB" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{name:<24} {r['throughput_rps']:>8.2f} req/s  p50 {r['p50_ms']:>9.2f} ms  "
+              f"p95 {r['p95_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  rss {rss}{recall}{errors}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+    if any(r.get("errors") for r in results["scenarios"].values()):
+        sys.exit("Some benchmark requests failed, the latencies above are not meaningful")
+
+
+if __name__ == "__main__":
+    main_cli()
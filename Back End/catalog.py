@@ -0,0 +1,520 @@
+"""Read-only reference data shared by every request.
+
+The pathway endpoint used to re-open and parse the same JSON/npy files on every
+call (and some of them once per skill). A Catalog loads all of it once, builds
+the lookup dicts that replace the old linear scans, and is then only ever read.
+
+Building one still means parsing ~30 MB of JSON and rebuilding the skill graph,
+so Catalog.load() keeps a binary snapshot of the finished catalog (its plain
+Python/numpy state; the FAISS skill index is saved separately, see
+skill_index.py) and reuses it as long as none of the source files changed. The snapshot is a pickle, so it must live
+somewhere only the service itself can write.
+
+The numpy arrays in the snapshot are stored out of band, after the pickle, each
+at an aligned offset. With mmap=True they are loaded as read-only views of the
+memory-mapped file instead of copies, and so are the course embeddings and the
+FAISS index. Every worker process of a multi-worker deployment then shares one
+copy of the matrices through the page cache, and only the Python objects (the
+parsed JSON and lookup dicts) are per process.
+
+The snapshot header carries a SHA-256 of the rest of the file, checked on every
+load, and the catalog's data version. The snapshot also records the SHA-256 of
+the compiled files loaded next to it (skillsRSD.bin, the FAISS index, the
+transition table and the course embeddings) and is rejected if one of them was
+replaced by a different build. `python compile_data.py artifact`
+recompiles everything from the source files, checks they are consistent with
+each other (see Catalog.check()) and writes the snapshot the server loads, at
+start or on a hot reload.
+"""
+import hashlib
+import io
+import json
+import mmap as mmap_module
+import os
+import pickle
+import struct
+import threading
+
+import numpy as np
+
+from degrees import nearest_degrees
+from encoder import REFERENCE_BACKEND
+from job_search import JobSearchIndex
+from rsd_store import DEFAULT_STORE, HEADER as RSD_HEADER, RSDStore
+from skill_index import describe, index_path, open_skill_index
+from transitions import TRANSITIONS_FILE, JobTransitions
+
+
+# course_embeddings.<digest>.npy - keyed by the course texts it was encoded from,
+# so an edited courses.json is never ranked with stale vectors; always the
+# reference encoder's vectors, the same space as job_embeddings.npy
+COURSE_EMBEDDINGS = "course_embeddings.{}.npy"
+SNAPSHOT = "catalog.snapshot"
+SNAPSHOT_FORMAT = 8
+# magic, pickle length, number of out-of-band buffers, sha256 of everything after
+# the header; then (offset, length) per buffer
+SNAPSHOT_HEADER = struct.Struct("<8sQQ32s")
+SNAPSHOT_BUFFER = struct.Struct("<QQ")
+SNAPSHOT_MAGIC = b"PWSNAP\x00\x01"
+# out-of-band arrays start on cache line boundaries
+SNAPSHOT_ALIGNMENT = 64
+
+# files a Catalog is built from, a snapshot is only reused while none of them changed
+SOURCE_FILES = (
+    "detailed_occupations.json",
+    "job_embeddings.npy",
+    "skillOrder.json",
+    "skill_embeddings2.npy",
+    "courses.json",
+    "courses_with_skills.json",
+    "manoa_degree_pathways.json",
+    "path_embeddings.npy",
+)
+# attributes that are rebuilt on load instead of pickled
+_NOT_SNAPSHOTTED = (
+    "data_dir", "_hasher", "_course_embeddings_lock", "course_embeddings", "rsd",
+    "skill_search_index", "skill_index_description", "skill_index_kind", "version", "transitions", "mmap",
+)
+
+
+def course_text(course):
+    return f"{course.get('course_title', '')}: {course.get('course_desc', '')}"
+
+
+def job_query_text(job):
+    # the string job_embeddings.npy rows were encoded from
+    return f"{job['SOC Title']}: {job['SOC Definition']}"
+
+
+def courses_digest(courses):
+    """Digest of the texts encode_courses() embeds, changes whenever one of them does."""
+    hasher = hashlib.sha256()
+    for course in courses:
+        hasher.update(course_text(course).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()[:16]
+
+
+def course_embeddings_name(courses):
+    return COURSE_EMBEDDINGS.format(courses_digest(courses))
+
+
+def encode_courses(courses, model):
+    """One normalized embedding row per course, in courses.json order."""
+    return model.encode(
+        [course_text(course) for course in courses],
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).astype(np.float32)
+
+
+def to_csr(rows, num_rows):
+    """Build (indptr, indices) arrays from a {row: [column, ...]} mapping."""
+    lengths = np.zeros(num_rows, dtype=np.int64)
+    for row, columns in rows.items():
+        lengths[row] = len(columns)
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.zeros(indptr[-1], dtype=np.int32)
+    for row, columns in rows.items():
+        indices[indptr[row]:indptr[row + 1]] = columns
+    return indptr, indices
+
+
+def save_course_embeddings(data_dir, name, course_embeddings):
+    """Write the matrix atomically and drop the ones encoded from older course texts, False if it could not be written."""
+    path = os.path.join(data_dir, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    try:
+        np.save(tmp_path, course_embeddings)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    for stale in os.listdir(data_dir):
+        if stale.startswith("course_embeddings") and stale.endswith(".npy") and stale != name:
+            try:
+                os.remove(os.path.join(data_dir, stale))
+            except OSError:
+                pass
+    return True
+
+
+def source_fingerprint(data_dir, rsd_path):
+    """(name, size, mtime) of every source file, cheap enough to check on each start."""
+    fingerprint = []
+    for path in [os.path.join(data_dir, name) for name in SOURCE_FILES] + [rsd_path]:
+        stat = os.stat(path)
+        fingerprint.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def derived_files(skill_index_kind, course_embeddings_name):
+    """Compiled files a catalog loads next to its snapshot."""
+    return (
+        DEFAULT_STORE,
+        os.path.basename(index_path(".", skill_index_kind)),
+        TRANSITIONS_FILE,
+        course_embeddings_name,
+    )
+
+
+def file_digests(data_dir, names):
+    """{name: sha256} of the named files that exist in data_dir."""
+    digests = {}
+    for name in names:
+        hasher = hashlib.sha256()
+        try:
+            with open(os.path.join(data_dir, name), "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    hasher.update(chunk)
+        except FileNotFoundError:
+            continue
+        digests[name] = hasher.hexdigest()
+    return digests
+
+
+def _aligned(offset):
+    return -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+def write_snapshot_file(f, snapshot):
+    """Pickle snapshot into f with its numpy arrays stored raw after the pickle (protocol 5 buffers).
+    Returns the checksum (hex) stored in the header."""
+    buffers = []
+    data = pickle.dumps(snapshot, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    table = []
+    position = _aligned(SNAPSHOT_HEADER.size + SNAPSHOT_BUFFER.size * len(raws) + len(data))
+    for raw in raws:
+        table.append((position, raw.nbytes))
+        position = _aligned(position + raw.nbytes)
+    checksum = hashlib.sha256()
+
+    def write(chunk):
+        checksum.update(chunk)
+        f.write(chunk)
+
+    # header rewritten with the checksum once everything after it is written
+    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(data), len(table), bytes(32)))
+    for entry in table:
+        write(SNAPSHOT_BUFFER.pack(*entry))
+    write(data)
+    for (offset, _), raw in zip(table, raws):
+        write(b"\0" * (offset - f.tell()))
+        write(raw)
+    f.seek(0)
+    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(data), len(table), checksum.digest()))
+    return checksum.hexdigest()
+
+
+def read_snapshot_file(path, mmap=False):
+    """Inverse of write_snapshot_file(), raises ValueError if the file is not an intact snapshot.
+    With mmap the arrays are read-only views of the mapped file."""
+    with open(path, "rb") as f:
+        if mmap:
+            view = memoryview(mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ))
+        else:
+            view = memoryview(bytearray(f.read()))
+    magic, data_length, buffer_count, checksum = SNAPSHOT_HEADER.unpack_from(view, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a catalog snapshot")
+    if hashlib.sha256(view[SNAPSHOT_HEADER.size:]).digest() != checksum:
+        raise ValueError(f"{path} does not match its checksum")
+    start = SNAPSHOT_HEADER.size
+    buffers = []
+    for _ in range(buffer_count):
+        offset, length = SNAPSHOT_BUFFER.unpack_from(view, start)
+        buffers.append(view[offset:offset + length])
+        start += SNAPSHOT_BUFFER.size
+    return pickle.loads(view[start:start + data_length], buffers=buffers)
+
+
+def csr_gather(indptr, indices, rows):
+    """Return (row position, column) pairs for every stored entry of the given rows."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    positions = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return positions, indices[np.repeat(starts, lengths) + offsets]
+
+
+class Catalog:
+    def __init__(self, data_dir=".", skill_index=None, mmap=False):
+        """skill_index holds open_skill_index() options (kind, nprobe, ef_search), flat by default.
+        mmap memory-maps the compiled files (course embeddings, FAISS index) instead of reading them."""
+        self.data_dir = data_dir
+        self.mmap = mmap
+        # every file read below goes into this hash, see self.version
+        self._hasher = hashlib.sha256()
+
+        # occupations
+        self.jobs = self._load_json("detailed_occupations.json")
+        self.job_titles = [job["SOC Title"] for job in self.jobs]
+        # last match wins, same as the old enumerate() loop
+        self.job_index = {title: idx for idx, title in enumerate(self.job_titles)}
+        # job_embeddings.npy rows are the encoded "Title: Definition" strings
+        self.job_query_index = {job_query_text(job): idx for idx, job in enumerate(self.jobs)}
+        self.job_embeddings = self._load_npy("job_embeddings.npy")
+        # typeahead index for /jobs/search
+        self.job_search = JobSearchIndex(self.jobs)
+
+        # skills - skillOrder.json has some repeated names, the first one is the
+        # row that objectiveSkillIndex() used to return
+        self.skills = self._load_json("skillOrder.json")
+        self.skill_index = {}
+        for idx, skill in enumerate(self.skills):
+            self.skill_index.setdefault(skill, idx)
+        self.skill_embeddings = self._load_npy("skill_embeddings2.npy")
+
+        # courses - a course id is its position in courses.json
+        self.courses = self._load_json("courses.json")
+        skill_courses = {}
+        for course_id, course in enumerate(self.courses):
+            for skill in course.get("skills") or []:
+                ids = skill_courses.setdefault(skill, [])
+                # a course listing the same skill twice was still only returned once
+                if not ids or ids[-1] != course_id:
+                    ids.append(course_id)
+        # skill -> course id inverted index as CSR over skillOrder rows, so
+        # repeated skill names each get the courses of that name
+        self.skill_course_indptr, self.skill_course_ids = to_csr(
+            {idx: skill_courses[skill] for idx, skill in enumerate(self.skills) if skill in skill_courses},
+            len(self.skills),
+        )
+        self.skill_course_counts = np.diff(self.skill_course_indptr)
+        self.course_embeddings_name = course_embeddings_name(self.courses)
+
+        # course embeddings, row i is course id i (see compile_data.py courses)
+        self._load_course_embeddings()
+
+        # skill co-occurrence graph from courses_with_skills.json: two skills are
+        # adjacent when they share a course. Stored as CSR over the first
+        # skillOrder row of each name; skills outside skillOrder can never be
+        # picked by the search so they are dropped.
+        skill_graph = self._load_json("courses_with_skills.json")["skills_to_courses"]
+        course_to_skills = {}
+        for skill, courses in skill_graph.items():
+            for course in courses:
+                course_to_skills.setdefault(course, set()).add(skill)
+        adjacency = {}
+        for skill, courses in skill_graph.items():
+            if skill not in self.skill_index:
+                continue
+            connected_skills = set()
+            for course in courses:
+                connected_skills.update(course_to_skills[course])
+            connected_skills.discard(skill)  # remove self-loop
+            adjacency[self.skill_index[skill]] = sorted(
+                self.skill_index[s] for s in connected_skills if s in self.skill_index
+            )
+        self.skill_adjacency_indptr, self.skill_adjacency = to_csr(adjacency, len(self.skills))
+        self.in_skill_graph = np.zeros(len(self.skills), dtype=bool)
+        self.in_skill_graph[list(adjacency)] = True
+
+        # degree programs - path_embeddings.npy row i is program i; the nearest
+        # programs of every occupation are looked up once here (see degrees.py)
+        self.degrees = self._load_json("manoa_degree_pathways.json")
+        self.degree_embeddings = self._load_npy("path_embeddings.npy")
+        if len(self.degree_embeddings) != len(self.degrees):
+            raise ValueError(
+                f"path_embeddings.npy has {len(self.degree_embeddings)} rows for {len(self.degrees)} degree programs"
+            )
+        self.job_degree_ids, self.job_degree_scores = nearest_degrees(self.job_embeddings, self.degree_embeddings)
+
+        # skillsRSD descriptions, compiled if the store is missing or older than skillsRSD/
+        self.rsd = RSDStore.open_or_compile(self._path(DEFAULT_STORE), self._path("skillsRSD"))
+        with open(self.rsd.path, "rb") as f:
+            # past the header, whose source mtimes would change the version without a content change
+            f.seek(RSD_HEADER.size)
+            self._hasher.update(DEFAULT_STORE.encode("utf-8"))
+            self._hasher.update(f.read())
+
+        # data version - changes whenever any of the source files change
+        self.data_version = self._hasher.hexdigest()[:16]
+
+        self._open_skill_index(skill_index)
+        self._load_transitions()
+
+    @classmethod
+    def load(cls, data_dir=".", snapshot=SNAPSHOT, skill_index=None, mmap=False):
+        """Catalog from the snapshot if it is still current, otherwise built from the
+        source files and snapshotted for the next start. snapshot=None disables it.
+        With mmap the arrays are shared views of the snapshot file, see the module docstring."""
+        if snapshot:
+            snapshot_path = os.path.join(data_dir, snapshot)
+            catalog = cls.from_snapshot(snapshot_path, data_dir, skill_index, mmap)
+            if catalog is not None:
+                return catalog
+        catalog = cls(data_dir, skill_index, mmap)
+        if snapshot and catalog.save_snapshot(snapshot_path) and mmap:
+            # reopen so this process maps the arrays too instead of keeping its private copies
+            catalog = cls.from_snapshot(snapshot_path, data_dir, skill_index, mmap) or catalog
+        return catalog
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path, data_dir=".", skill_index=None, mmap=False):
+        """Load a snapshot written by save_snapshot(), or None if it is missing or stale."""
+        try:
+            snapshot = read_snapshot_file(snapshot_path, mmap)
+        except Exception:
+            # missing, truncated or written by an incompatible version - rebuild
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+            return None
+
+        rsd = RSDStore.open_or_compile(os.path.join(data_dir, DEFAULT_STORE), os.path.join(data_dir, "skillsRSD"))
+        try:
+            if snapshot["fingerprint"] != source_fingerprint(data_dir, rsd.path):
+                return None
+            # the compiled files this load reads must be the ones the snapshot was built with
+            kind = (skill_index or {}).get("kind", "flat")
+            names = derived_files(kind, snapshot["state"]["course_embeddings_name"])
+            recorded = {name: digest for name, digest in snapshot["derived"].items() if name in names}
+            if file_digests(data_dir, recorded) != recorded:
+                return None
+        except OSError:
+            return None
+
+        catalog = cls.__new__(cls)
+        catalog.__dict__.update(snapshot["state"])
+        catalog.data_dir = data_dir
+        catalog.mmap = mmap
+        catalog.rsd = rsd
+        catalog._open_skill_index(skill_index)
+        catalog._load_course_embeddings()
+        catalog._load_transitions()
+        return catalog
+
+    def save_snapshot(self, snapshot_path):
+        """Write the catalog to snapshot_path atomically, returns its checksum or None if it could not be written."""
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "fingerprint": source_fingerprint(self.data_dir, self.rsd.path),
+            "derived": file_digests(self.data_dir, derived_files(self.skill_index_kind, self.course_embeddings_name)),
+            "state": {key: value for key, value in self.__dict__.items() if key not in _NOT_SNAPSHOTTED},
+        }
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                checksum = write_snapshot_file(f, snapshot)
+            os.replace(tmp_path, snapshot_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        return checksum
+
+    def _open_skill_index(self, options):
+        self.skill_index_kind = (options or {}).get("kind", "flat")
+        self.skill_search_index = open_skill_index(
+            self.data_dir, self.skill_embeddings, self._path("skill_embeddings2.npy"), mmap=self.mmap, **(options or {})
+        )
+        # used to key cached results - approximate indexes can return different
+        # skills, so their configuration is part of it
+        self.skill_index_description = describe(self.skill_search_index)
+        if self.skill_index_description == "flat":
+            self.version = self.data_version
+        else:
+            key = f"{self.data_version}:{self.skill_index_description}".encode("utf-8")
+            self.version = hashlib.sha256(key).hexdigest()[:16]
+
+    def _load_transitions(self):
+        # depends on the skill index configuration, so keyed by self.version
+        self.transitions = JobTransitions.open_or_compile(self._path(TRANSITIONS_FILE), self)
+
+    def _load_course_embeddings(self):
+        self.course_embeddings = None
+        self._course_embeddings_lock = threading.Lock()
+        embeddings_path = self._path(self.course_embeddings_name)
+        if os.path.exists(embeddings_path):
+            course_embeddings = np.load(embeddings_path, mmap_mode="r" if self.mmap else None)
+            if len(course_embeddings) == len(self.courses):
+                self.course_embeddings = course_embeddings
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _read_bytes(self, name):
+        with open(self._path(name), "rb") as f:
+            data = f.read()
+        self._hasher.update(name.encode("utf-8"))
+        self._hasher.update(data)
+        return data
+
+    def _load_json(self, name):
+        return json.loads(self._read_bytes(name).decode("utf-8"))
+
+    def _load_npy(self, name):
+        return np.load(io.BytesIO(self._read_bytes(name)))
+
+    def check(self):
+        """Problems that make the source files inconsistent with each other, empty when they are fine."""
+        problems = []
+        for name, embeddings, rows in (
+            ("job_embeddings.npy", self.job_embeddings, len(self.jobs)),
+            ("skill_embeddings2.npy", self.skill_embeddings, len(self.skills)),
+            ("path_embeddings.npy", self.degree_embeddings, len(self.degrees)),
+        ):
+            if len(embeddings) != rows:
+                problems.append(f"{name} has {len(embeddings)} rows for {rows} entries")
+            if embeddings.shape[1] != self.job_embeddings.shape[1]:
+                problems.append(f"{name} has dimension {embeddings.shape[1]}, job_embeddings.npy has {self.job_embeddings.shape[1]}")
+        if self.course_embeddings is not None and self.course_embeddings.shape[1] != self.job_embeddings.shape[1]:
+            problems.append(f"{self.course_embeddings_name} has dimension {self.course_embeddings.shape[1]}")
+        if self.course_embeddings is None and self.stale_course_embeddings():
+            problems.append(
+                "course embeddings were encoded from a different courses.json, "
+                "re-encode them with `python compile_data.py courses`"
+            )
+        # every skill that can become a pathway node needs its skillsRSD description
+        node_rows = np.flatnonzero(self.in_skill_graph & (self.skill_course_counts > 0))
+        missing = sorted({self.skills[row] for row in node_rows if self.skills[row] not in self.rsd})
+        if missing:
+            problems.append(f"{len(missing)} skills with courses have no skillsRSD entry, e.g. {missing[0]!r}")
+        known = set(self.skill_index)
+        unknown = {skill for course in self.courses for skill in course.get("skills") or [] if skill not in known}
+        if unknown:
+            problems.append(f"{len(unknown)} course skills are not in skillOrder.json, e.g. {sorted(unknown)[0]!r}")
+        return problems
+
+    def course_ids(self, skill_idx):
+        """Ids (in courses.json order) of the courses that list the skill at this skillOrder row."""
+        return self.skill_course_ids[self.skill_course_indptr[skill_idx]:self.skill_course_indptr[skill_idx + 1]]
+
+    def get_courses(self, skill_idx):
+        return [self.courses[course_id] for course_id in self.course_ids(skill_idx)]
+
+    def skill_subgraph(self, skill_rows):
+        """Dense boolean adjacency between the given skillOrder rows."""
+        position = np.full(len(self.skills), -1, dtype=np.int64)
+        position[skill_rows] = np.arange(len(skill_rows))
+        rows, columns = csr_gather(self.skill_adjacency_indptr, self.skill_adjacency, skill_rows)
+        columns = position[columns]
+        connected = columns >= 0
+        subgraph = np.zeros((len(skill_rows), len(skill_rows)), dtype=bool)
+        subgraph[rows[connected], columns[connected]] = True
+        return subgraph
+
+    def get_course_embeddings(self, get_model):
+        """Course embedding matrix, encoded once if the compiled file is missing or stale.
+        Only the reference encoder's vectors are saved - the file is shared by every
+        server on this data directory, whatever PATHWAY_ENCODER each of them runs."""
+        if self.course_embeddings is None:
+            with self._course_embeddings_lock:
+                if self.course_embeddings is None:
+                    model = get_model()
+                    course_embeddings = encode_courses(self.courses, model)
+                    if getattr(model, "encoder_backend", None) == REFERENCE_BACKEND:
+                        save_course_embeddings(self.data_dir, self.course_embeddings_name, course_embeddings)
+                    self.course_embeddings = course_embeddings
+        return self.course_embeddings
+
+    def stale_course_embeddings(self):
+        """Course embedding files in the data directory that were encoded from other course texts."""
+        return [
+            name for name in os.listdir(self.data_dir)
+            if name.startswith("course_embeddings") and name.endswith(".npy") and name != self.course_embeddings_name
+        ]
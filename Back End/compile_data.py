@@ -0,0 +1,186 @@
+"""Offline compile steps for the backend's reference data.
+
+Run from the Back End directory, e.g.
+
+    python compile_data.py rsd
+    python compile_data.py courses
+    python compile_data.py snapshot
+    python compile_data.py skill-index --kind hnsw
+    python compile_data.py transitions
+    python compile_data.py artifact
+
+artifact runs every step a server start depends on: it recompiles the skillsRSD
+store, builds the catalog from the source files, refuses to continue if they
+are inconsistent (Catalog.check()), builds the skill index and transition table
+and writes the checksummed snapshot. All of it happens in a scratch directory,
+and the compiled files are only moved into the data directory once the snapshot
+has been read back, so a failed run leaves the deployed files untouched. A running server picks it up on SIGHUP or
+POST /admin/reload.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from catalog import SNAPSHOT, Catalog, course_embeddings_name, derived_files, encode_courses, save_course_embeddings
+from rsd_store import DEFAULT_SOURCE, DEFAULT_STORE, compile_rsd_store
+from skill_index import INDEX_TYPES, build_skill_index, index_path
+from transitions import TRANSITIONS_FILE, JobTransitions
+
+
+def cmd_rsd(args):
+    count = compile_rsd_store(args.src, args.out)
+    print(f"Wrote {count} skills to {args.out}")
+
+
+def cmd_courses(args):
+    from sentence_transformers import SentenceTransformer
+
+    with open(args.courses, "r", encoding="utf-8") as f:
+        courses = json.load(f)
+    embeddings = encode_courses(courses, SentenceTransformer(args.model))
+    # named after the course texts, see catalog.COURSE_EMBEDDINGS
+    out_dir = os.path.dirname(args.courses)
+    name = course_embeddings_name(courses)
+    if not save_course_embeddings(out_dir or ".", name, embeddings):
+        raise SystemExit(f"Could not write {name}")
+    print(f"Wrote {embeddings.shape[0]}x{embeddings.shape[1]} course embeddings to {os.path.join(out_dir, name)}")
+
+
+def cmd_snapshot(args):
+    catalog = Catalog(args.data_dir)
+    if not catalog.save_snapshot(args.out):
+        raise SystemExit(f"Could not write {args.out}")
+    print(f"Wrote catalog snapshot {catalog.version} to {args.out}")
+
+
+def _link_or_copy(src, dst):
+    # symlinks need admin rights or developer mode on Windows, hard links only
+    # work for files on the same volume, a copy always does
+    try:
+        os.symlink(src, dst, target_is_directory=os.path.isdir(src))
+        return
+    except OSError:
+        pass
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _stage_artifact_dir(data_dir):
+    """Scratch directory inside data_dir that links to (or holds copies of) the current
+    source and compiled files, and the inode of each entry it starts with.
+    Whatever the catalog writes there replaces the entry, never the file it came from."""
+    stage = tempfile.mkdtemp(prefix=".artifact-", dir=data_dir)
+    entries = {}
+    for name in os.listdir(data_dir):
+        if not name.startswith(".artifact-"):
+            path = os.path.join(stage, name)
+            _link_or_copy(os.path.abspath(os.path.join(data_dir, name)), path)
+            entries[name] = os.lstat(path).st_ino
+    return stage, entries
+
+
+def cmd_artifact(args):
+    stage, entries = _stage_artifact_dir(args.data_dir)
+    try:
+        count = compile_rsd_store(os.path.join(stage, DEFAULT_SOURCE), os.path.join(stage, DEFAULT_STORE))
+        print(f"Compiled {count} skills")
+
+        try:
+            catalog = Catalog(stage, {"kind": args.kind})
+        except (KeyError, ValueError) as e:
+            raise SystemExit(f"error: {e}\nSource files are inconsistent, no artifact written")
+        problems = catalog.check()
+        for problem in problems:
+            print(f"error: {problem}")
+        if problems:
+            raise SystemExit(f"Source files are inconsistent, {len(problems)} problem(s), no artifact written")
+
+        staged = os.path.join(stage, args.out)
+        checksum = catalog.save_snapshot(staged)
+        if not checksum:
+            raise SystemExit(f"Could not write {staged}")
+        # read it back the way the server will
+        if Catalog.from_snapshot(staged, stage, {"kind": args.kind}) is None:
+            raise SystemExit(f"{staged} could not be loaded back")
+
+        # compiled files first, the snapshot that refers to them last; an entry
+        # that is still the one staged was left as it was
+        for name in derived_files(args.kind, catalog.course_embeddings_name) + (args.out,):
+            staged_file = os.path.join(stage, name)
+            if os.path.isfile(staged_file) and os.lstat(staged_file).st_ino != entries.get(name):
+                os.replace(staged_file, os.path.join(args.data_dir, name))
+    finally:
+        shutil.rmtree(stage)
+    out = os.path.join(args.data_dir, args.out)
+    print(f"Wrote catalog {catalog.version} ({catalog.skill_index_description}) to {out}, sha256 {checksum}")
+
+
+def cmd_skill_index(args):
+    import faiss
+
+    embeddings = np.load(os.path.join(args.data_dir, "skill_embeddings2.npy"))
+    index = build_skill_index(embeddings, args.kind)
+    out = index_path(args.data_dir, args.kind)
+    faiss.write_index(index, out)
+    print(f"Wrote {args.kind} index over {index.ntotal} skills to {out}")
+
+
+def cmd_transitions(args):
+    catalog = Catalog(args.data_dir, {"kind": args.kind})
+    transitions = JobTransitions.compute(catalog)
+    out = os.path.join(args.data_dir, TRANSITIONS_FILE)
+    if not transitions.save(out):
+        raise SystemExit(f"Could not write {out}")
+    print(f"Wrote transitions between {len(catalog.jobs)} occupations ({catalog.version}) to {out}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile backend reference data")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rsd = sub.add_parser("rsd", help="compile skillsRSD into a memory-mapped store")
+    rsd.add_argument("--src", default=DEFAULT_SOURCE)
+    rsd.add_argument("--out", default=DEFAULT_STORE)
+    rsd.set_defaults(func=cmd_rsd)
+
+    courses = sub.add_parser("courses", help="encode every course in courses.json into a .npy matrix")
+    courses.add_argument("--courses", default="courses.json")
+    courses.add_argument("--model", default="all-mpnet-base-v2")
+    courses.set_defaults(func=cmd_courses)
+
+    snapshot = sub.add_parser("snapshot", help="build the catalog and save the binary snapshot the server starts from")
+    snapshot.add_argument("--data-dir", default=".")
+    snapshot.add_argument("--out", default=SNAPSHOT)
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    skill_index = sub.add_parser("skill-index", help="build and save the FAISS skill index")
+    skill_index.add_argument("--kind", choices=INDEX_TYPES, default="flat")
+    skill_index.add_argument("--data-dir", default=".")
+    skill_index.set_defaults(func=cmd_skill_index)
+
+    transitions = sub.add_parser("transitions", help="compute the job-to-job skill overlap table behind /transitions")
+    transitions.add_argument("--kind", choices=INDEX_TYPES, default="flat", help="skill index the server runs with")
+    transitions.add_argument("--data-dir", default=".")
+    transitions.set_defaults(func=cmd_transitions)
+
+    artifact = sub.add_parser("artifact", help="check the source files and compile everything the server loads")
+    artifact.add_argument("--kind", choices=INDEX_TYPES, default="flat", help="skill index the server runs with")
+    artifact.add_argument("--data-dir", default=".")
+    artifact.add_argument("--out", default=SNAPSHOT, help="snapshot file name in the data directory")
+    artifact.set_defaults(func=cmd_artifact)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
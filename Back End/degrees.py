@@ -0,0 +1,41 @@
+"""Degree programs nearest to each occupation.
+
+manoa_degree_pathways.json lists the UH Mānoa degree programs with their
+year/semester course plans, and path_embeddings.npy holds one normalized
+embedding per program in the same order. Both are in the embedding space of
+job_embeddings.npy, so the programs closest to an occupation are an
+inner-product search of its job_embeddings row over the program rows.
+
+All 867 occupations are searched in one batch when the catalog is built, and
+only the top DEGREE_TOP_K program ids and scores per occupation are kept (and
+snapshotted with the catalog), so /degrees/{job} is a table lookup.
+"""
+import numpy as np
+
+from skill_index import build_skill_index
+
+DEGREE_TOP_K = 10
+
+
+def nearest_degrees(job_embeddings, path_embeddings, k=DEGREE_TOP_K):
+    """(ids, scores), both (len(job_embeddings), k): the k nearest programs of every occupation, best first."""
+    if len(path_embeddings) != 0 and path_embeddings.shape[1] != job_embeddings.shape[1]:
+        raise ValueError(
+            f"path_embeddings.npy has dimension {path_embeddings.shape[1]}, "
+            f"job_embeddings.npy has {job_embeddings.shape[1]}"
+        )
+    k = min(k, len(path_embeddings))
+    index = build_skill_index(path_embeddings, "flat")
+    scores, ids = index.search(np.ascontiguousarray(job_embeddings, dtype=np.float32), k)
+    return ids.astype(np.int32), scores.astype(np.float32)
+
+
+def degree_program(program, score):
+    """Response form of one program: name, institution, credits, similarity and its semester plan."""
+    return {
+        "program_name": program["program_name"],
+        "institution": program.get("institution"),
+        "total_credits": program.get("total_credits"),
+        "score": round(float(score), 4),
+        "years": program.get("years", []),
+    }
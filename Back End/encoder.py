@@ -0,0 +1,115 @@
+"""Text encoders and the query embedding cache.
+
+Catalog occupations already have precomputed embeddings (job_embeddings.npy),
+so the model is only needed for free text. The same few strings tend to be
+asked for over and over, so encodings are kept in a small LRU keyed by text.
+
+load_encoder() picks the backend behind main.get_model(): the stock fp32
+SentenceTransformer, the same model with its Linear layers dynamically
+quantized to int8 for CPU inference (smaller and faster, see encoder_parity.py
+for how far its embeddings drift), or the hashing stub.
+
+HashingEncoder is a deterministic stand-in for the SentenceTransformer (same
+encode() signature, same 768 dimensions) so benchmarks and offline runs work
+without downloading the model. Its vectors are not semantically meaningful.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EMBEDDING_DIM = 768
+MODEL_NAME = "all-mpnet-base-v2"
+ENCODER_BACKENDS = ("fp32", "int8", "hashing")
+# the backend job_embeddings.npy and the other precomputed matrices were encoded with
+REFERENCE_BACKEND = "fp32"
+
+
+class HashingEncoder:
+    """Feature-hashes word unigrams and bigrams into a fixed-size vector."""
+
+    encoder_backend = "hashing"
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = self._encode_one(text)
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors[0] if single else vectors
+
+
+def load_encoder(backend="fp32", threads=None):
+    """Build the encoder for a backend name, threads caps torch's intra-op thread pool.
+    The encoder's encoder_backend attribute is the backend name."""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (expected one of {', '.join(ENCODER_BACKENDS)})")
+    if backend == "hashing":
+        return HashingEncoder()
+
+    # imported here so the hashing encoder works without torch installed
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+    if backend == "fp32":
+        model = SentenceTransformer(MODEL_NAME)
+    else:
+        # dynamic quantization only has CPU kernels
+        model = SentenceTransformer(MODEL_NAME, device="cpu")
+        model.eval()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.encoder_backend = backend
+    return model
+
+
+class EmbeddingCache:
+    def __init__(self, get_model, maxsize=1024):
+        self._get_model = get_model
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, text):
+        """Normalized embedding for text, encoding it only on a cache miss."""
+        with self._lock:
+            embedding = self._entries.get(text)
+            if embedding is not None:
+                self._entries.move_to_end(text)
+                self.hits += 1
+                return embedding
+            self.misses += 1
+
+        embedding = self._get_model().encode(text, convert_to_numpy=True, normalize_embeddings=True)
+        embedding.setflags(write=False)
+
+        with self._lock:
+            self._entries[text] = embedding
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return embedding
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
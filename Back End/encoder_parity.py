@@ -0,0 +1,104 @@
+"""Parity check between two encoder backends.
+
+Encodes every occupation query (the "Title: Definition" strings
+job_embeddings.npy was built from) with a reference and a candidate backend and
+reports how much the candidate changes what the pathway actually uses:
+
+- cosine drift, 1 - cos(reference, candidate) per occupation
+- top-k overlap of the FAISS skill search, the share of the reference's k
+  nearest skills the candidate also returns
+- encode throughput of each backend
+
+The reference defaults to the precomputed job_embeddings.npy (the fp32 model),
+so the fp32 model does not need to be loaded:
+
+    python encoder_parity.py --candidate int8
+    python encoder_parity.py --reference fp32 --candidate int8 --threads 4 --max-drift 0.02
+
+Exits non-zero when --max-drift or --min-overlap is given and not met.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from catalog import Catalog, job_query_text
+from encoder import ENCODER_BACKENDS, load_encoder
+
+
+def encode_all(encoder, texts, batch_size):
+    start = time.perf_counter()
+    embeddings = encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return embeddings.astype(np.float32), time.perf_counter() - start
+
+
+def topk_overlap(index, reference, candidate, k):
+    """Mean share of each reference row's top-k search hits the candidate row also returns."""
+    _, reference_hits = index.search(reference, k)
+    _, candidate_hits = index.search(candidate, k)
+    overlaps = [len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(reference_hits, candidate_hits)]
+    return float(np.mean(overlaps)), float(np.min(overlaps))
+
+
+def parity_report(catalog, reference, candidate, ks=(10, 100, 300), batch_size=64):
+    """Compare two backends over the occupation catalog. reference=None uses job_embeddings.npy."""
+    texts = [job_query_text(job) for job in catalog.jobs]
+    report = {"occupations": len(texts)}
+
+    if reference is None:
+        reference_embeddings = catalog.job_embeddings.astype(np.float32)
+        reference_embeddings /= np.linalg.norm(reference_embeddings, axis=1, keepdims=True)
+    else:
+        reference_embeddings, seconds = encode_all(reference, texts, batch_size)
+        report["reference_texts_per_second"] = round(len(texts) / seconds, 1)
+    candidate_embeddings, seconds = encode_all(candidate, texts, batch_size)
+    report["candidate_texts_per_second"] = round(len(texts) / seconds, 1)
+
+    # clipped, float error makes identical rows come out a hair below zero
+    drift = np.maximum(1.0 - np.sum(reference_embeddings * candidate_embeddings, axis=1), 0.0)
+    report["cosine_drift"] = {
+        "mean": round(float(drift.mean()), 6),
+        "p95": round(float(np.percentile(drift, 95)), 6),
+        "max": round(float(drift.max()), 6),
+    }
+    report["topk_overlap"] = {}
+    for k in ks:
+        mean, worst = topk_overlap(catalog.skill_search_index, reference_embeddings, candidate_embeddings, k)
+        report["topk_overlap"][str(k)] = {"mean": round(mean, 4), "min": round(worst, 4)}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the embeddings of two encoder backends")
+    parser.add_argument("--reference", choices=("precomputed",) + ENCODER_BACKENDS, default="precomputed")
+    parser.add_argument("--candidate", choices=ENCODER_BACKENDS, default="int8")
+    parser.add_argument("--threads", type=int, help="torch thread count for both backends")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100, 300], help="skill search depths to compare")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-drift", type=float, help="fail if the mean cosine drift is above this")
+    parser.add_argument("--min-overlap", type=float, help="fail if the mean top-k overlap at the smallest k is below this")
+    parser.add_argument("--out", help="also write the report JSON here")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog.load()
+    reference = None if args.reference == "precomputed" else load_encoder(args.reference, args.threads)
+    candidate = load_encoder(args.candidate, args.threads)
+    report = parity_report(catalog, reference, candidate, args.k, args.batch_size)
+    report = {"reference": args.reference, "candidate": args.candidate, "threads": args.threads, **report}
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = args.max_drift is not None and report["cosine_drift"]["mean"] > args.max_drift
+    if args.min_overlap is not None:
+        failed = failed or report["topk_overlap"][str(min(args.k))]["mean"] < args.min_overlap
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Encoder sidecar: one model process serving every worker over a Unix socket.
+
+Each uvicorn worker (or process-mode pool worker) that loads its own
+SentenceTransformer multiplies the model's memory by the worker count. Instead
+the model can run once per node:
+
+    python encoder_service.py --socket /tmp/pathway-encoder.sock --encoder int8 --threads 4
+
+and the API workers are started with PATHWAY_ENCODER_SOCKET pointing at it, so
+main.get_model() returns a RemoteEncoder with the same encode() signature.
+
+Protocol, one request per message on a persistent connection: a request is a
+4-byte big-endian length and a JSON body {"texts", "normalize_embeddings",
+"batch_size"}. The reply is a length-prefixed JSON header
+{"rows", "dim", "backend"} (or {"error"}) followed by rows * dim float32 values.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+import numpy as np
+
+from encoder import EMBEDDING_DIM, ENCODER_BACKENDS, load_encoder
+
+LENGTH = struct.Struct(">I")
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("encoder connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def _send_message(sock, header, payload=b""):
+    body = json.dumps(header).encode("utf-8")
+    sock.sendall(LENGTH.pack(len(body)) + body + payload)
+
+
+def _recv_message(sock):
+    size, = LENGTH.unpack(_recv_exactly(sock, LENGTH.size))
+    return json.loads(_recv_exactly(sock, size))
+
+
+class RemoteEncoder:
+    """Client for the sidecar, a drop-in for the encoders load_encoder() returns.
+    Holds one connection per thread and reconnects once if the sidecar restarted."""
+
+    def __init__(self, socket_path, timeout=60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        # the sidecar's load_encoder() backend, known after its first reply
+        self.encoder_backend = None
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, request):
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                _send_message(sock, request)
+                header = _recv_message(sock)
+                if "error" in header:
+                    raise RuntimeError(f"encoder sidecar: {header['error']}")
+                self.encoder_backend = header.get("backend")
+                data = _recv_exactly(sock, header["rows"] * header["dim"] * 4)
+                return np.frombuffer(data, dtype=np.float32).reshape(header["rows"], header["dim"])
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt:
+                    raise
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        vectors = self._request({
+            "texts": texts,
+            "normalize_embeddings": bool(normalize_embeddings),
+            "batch_size": batch_size,
+        })
+        return vectors[0] if single else vectors
+
+
+class _EncodeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = _recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                # one encode at a time - the model already uses every torch thread
+                with self.server.encode_lock:
+                    vectors = self.server.encoder.encode(
+                        request["texts"],
+                        batch_size=request.get("batch_size", 32),
+                        convert_to_numpy=True,
+                        normalize_embeddings=request.get("normalize_embeddings", False),
+                    )
+                vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(request["texts"]), -1)
+            except Exception as e:
+                _send_message(self.request, {"error": str(e)})
+                continue
+            header = {"rows": vectors.shape[0], "dim": vectors.shape[1], "backend": self.server.backend}
+            _send_message(self.request, header, vectors.tobytes())
+
+
+# socketserver only defines the Unix socket servers where AF_UNIX exists (not on Windows)
+if hasattr(socket, "AF_UNIX"):
+    class EncoderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, socket_path, encoder, backend=None):
+            if os.path.exists(socket_path):
+                # left over from a previous run
+                os.remove(socket_path)
+            super().__init__(socket_path, _EncodeHandler)
+            self.encoder = encoder
+            self.backend = backend
+            self.encode_lock = threading.Lock()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one encoder to every API worker over a Unix socket")
+    parser.add_argument("--socket", default=os.environ.get("PATHWAY_ENCODER_SOCKET", "/tmp/pathway-encoder.sock"))
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=os.environ.get("PATHWAY_ENCODER", "fp32"))
+    parser.add_argument("--threads", type=int, help="torch thread count")
+    args = parser.parse_args(argv)
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("The encoder sidecar needs Unix domain sockets, which this platform does not have")
+
+    server = EncoderServer(args.socket, load_encoder(args.encoder, args.threads), args.encoder)
+    # exit through the finally below on SIGTERM too, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving the {args.encoder} encoder on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
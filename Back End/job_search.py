@@ -0,0 +1,141 @@
+"""In-memory typeahead index over the occupation catalog.
+
+Built once with the catalog (and pickled into its snapshot):
+
+- a prefix trie over the words of every SOC Title, and one over the SOC Codes
+- an inverted index from SOC Definition words to occupations
+- a character trigram index over title words, used when a query matches no
+  title/definition word at all (typos like "sofware")
+
+Every query word is treated as a prefix, so results update as the user types.
+An occupation has to match all query words; matches in the title rank above
+matches that only appear in the definition, titles that start with the query
+rank first.
+"""
+import re
+from bisect import bisect_left
+
+MAX_LIMIT = 100
+
+# score weights
+TITLE_WORD = 3.0
+TITLE_WORD_EXACT = 1.0
+DEFINITION_WORD = 1.0
+CODE_MATCH = 8.0
+TITLE_PREFIX = 5.0
+TITLE_EXACT = 10.0
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixTrie:
+    """Maps every prefix of the inserted keys to the ids stored under them."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, doc_id):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault("", set()).add(doc_id)
+
+    def prefix(self, key):
+        node = self.root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get("", set())
+
+
+class JobSearchIndex:
+    def __init__(self, jobs):
+        self.titles = [job["SOC Title"] for job in jobs]
+        self.codes = [job.get("SOC Code", "") for job in jobs]
+        self.title_words = [set(tokenize(title)) for title in self.titles]
+        self.title_trie = PrefixTrie()
+        self.code_trie = PrefixTrie()
+        self.definition_index = {}
+        self.trigram_index = {}
+        for doc_id, job in enumerate(jobs):
+            for word in self.title_words[doc_id]:
+                self.title_trie.insert(word, doc_id)
+                for gram in trigrams(word):
+                    self.trigram_index.setdefault(gram, set()).add(doc_id)
+            code = self.codes[doc_id].lower()
+            if code:
+                self.code_trie.insert(code, doc_id)
+                self.code_trie.insert(code.replace("-", ""), doc_id)
+            for word in tokenize(job.get("SOC Definition", "")):
+                self.definition_index.setdefault(word, set()).add(doc_id)
+        # definition words sorted, so a prefix is a contiguous range
+        self.definition_words = sorted(self.definition_index)
+
+    def _definition_prefix(self, word):
+        ids = set()
+        i = bisect_left(self.definition_words, word)
+        while i < len(self.definition_words) and self.definition_words[i].startswith(word):
+            ids |= self.definition_index[self.definition_words[i]]
+            i += 1
+        return ids
+
+    def _fuzzy(self, words):
+        """Occupations whose title words share the most trigrams with the query words."""
+        scores = {}
+        for word in words:
+            grams = trigrams(word)
+            counts = {}
+            for gram in grams:
+                for doc_id in self.trigram_index.get(gram, ()):
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+            for doc_id, count in counts.items():
+                similarity = count / len(grams)
+                if similarity >= 0.4:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + similarity
+        return scores
+
+    def search(self, query, limit=10, offset=0):
+        """Returns (total matches, [{"title", "code", "score"}]) for one page of results."""
+        limit = max(0, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        text = query.strip().lower()
+        words = tokenize(text)
+        if not words:
+            results = [(0.0, doc_id) for doc_id in range(len(self.titles))]
+        else:
+            scores = None
+            for word in words:
+                title_ids = self.title_trie.prefix(word)
+                definition_ids = self._definition_prefix(word)
+                word_scores = {doc_id: DEFINITION_WORD for doc_id in definition_ids}
+                for doc_id in title_ids:
+                    word_scores[doc_id] = TITLE_WORD + (TITLE_WORD_EXACT if word in self.title_words[doc_id] else 0.0)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {doc_id: score + word_scores[doc_id] for doc_id, score in scores.items() if doc_id in word_scores}
+            for doc_id in self.code_trie.prefix(text):
+                scores[doc_id] = scores.get(doc_id, 0.0) + CODE_MATCH
+            if not scores:
+                scores = self._fuzzy(words)
+            for doc_id in scores:
+                title = self.titles[doc_id].lower()
+                if title == text:
+                    scores[doc_id] += TITLE_EXACT
+                elif title.startswith(text):
+                    scores[doc_id] += TITLE_PREFIX
+            results = [(score, doc_id) for doc_id, score in scores.items()]
+            # best score first, then shorter and alphabetically earlier titles
+            results.sort(key=lambda item: (-item[0], len(self.titles[item[1]]), self.titles[item[1]]))
+        page = results[offset:offset + limit]
+        return len(results), [
+            {"title": self.titles[doc_id], "code": self.codes[doc_id], "score": round(score, 3)} for score, doc_id in page
+        ]
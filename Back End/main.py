@@ -1,5 +1,4 @@
 import json
-from sentence_transformers import SentenceTransformer
 import os
 import faiss
 import numpy as np
@@ -11,15 +10,54 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 import asyncio
+import hmac
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import SNAPSHOT, Catalog
+from degrees import degree_program
+from encoder import EmbeddingCache, load_encoder
+from job_search import MAX_LIMIT as MAX_SEARCH_LIMIT
+from metrics import Metrics, StageTrace
+from pathway_cache import PathwayCache, pathway_etag
+from serialization import compact_export, compress, dumps
+from worker_pool import Overloaded, WorkerPool
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup - do nothing, let requests lazy-load models
+    # Startup - start the shared worker pool and warm up the catalog and model.
+    # PATHWAY_WARMUP=background (default) serves /health right away and flips
+    # /ready once warm, blocking finishes the warm-up before accepting requests,
+    # lazy only loads the catalog and leaves the model to the first request
+    get_pool()
+    mode = os.environ.get("PATHWAY_WARMUP", "background")
+    if mode == "background":
+        threading.Thread(target=warm_up, name="pathway-warmup", daemon=True).start()
+    elif mode == "blocking":
+        warm_up()
+    else:
+        get_catalog()
+        _warmup.update(state="ready", seconds=0.0)
+    # SIGHUP swaps in a freshly compiled catalog without a restart, see reload_catalog()
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP,
+            lambda: threading.Thread(target=_reload_quietly, name="pathway-reload", daemon=True).start(),
+        )
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # no SIGHUP (Windows) or not in the main thread - the admin endpoint still works
+        pass
     yield
     # Shutdown
+    shutdown_pool()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -32,171 +70,757 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stage timings, request outcomes and cache stats, exported at /metrics
+_metrics = Metrics()
+
 # Global model - will be loaded on first use
 _model = None
+_model_lock = threading.Lock()
 
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("all-mpnet-base-v2")
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                socket_path = os.environ.get("PATHWAY_ENCODER_SOCKET")
+                if socket_path:
+                    # shared encoder sidecar, see encoder_service.py - imported here
+                    # because it needs Unix sockets, which Windows Python lacks
+                    from encoder_service import RemoteEncoder
+                    _model = RemoteEncoder(socket_path)
+                else:
+                    # fp32 (default), int8 or hashing (offline stub, benchmarks only)
+                    _model = load_encoder(
+                        os.environ.get("PATHWAY_ENCODER", "fp32"),
+                        threads=int(os.environ.get("PATHWAY_ENCODER_THREADS", "0")) or None,
+                    )
+                _metrics.observe_stage("model_load", time.perf_counter() - start)
     return _model
 
+# Global read-only catalog - built once by lifespan, shared by every request.
+# reload_catalog() replaces it as a whole; a computation takes one reference
+# at its start, so it finishes on the catalog it began with
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def load_catalog():
+    # PATHWAY_SNAPSHOT= (empty) always rebuilds from the source files
+    return Catalog.load(
+        snapshot=os.environ.get("PATHWAY_SNAPSHOT", SNAPSHOT) or None,
+        skill_index={
+            "kind": os.environ.get("PATHWAY_SKILL_INDEX", "flat"),
+            "nprobe": int(os.environ.get("PATHWAY_SKILL_INDEX_NPROBE", "0")) or None,
+            "ef_search": int(os.environ.get("PATHWAY_SKILL_INDEX_EF_SEARCH", "0")) or None,
+        },
+        # PATHWAY_MMAP=1 shares the arrays between worker processes
+        mmap=os.environ.get("PATHWAY_MMAP", "0") == "1",
+    )
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                start = time.perf_counter()
+                _catalog = load_catalog()
+                _metrics.observe_stage("catalog_load", time.perf_counter() - start)
+    return _catalog
+
+class CatalogChanged(Exception):
+    """Raised by a batch worker when the catalog was reloaded after the batch resolved it."""
+
+def get_catalog_version(version):
+    """The current catalog, if it is still the one a batch started with"""
+    catalog = get_catalog()
+    if catalog.version != version:
+        raise CatalogChanged(f"Catalog changed from {version} to {catalog.version}, please retry")
+    return catalog
+
+# Outcome of the last hot reload, reported by /ready
+_reload = {"state": None, "version": None, "previous_version": None, "seconds": None, "error": None}
+_reload_lock = threading.Lock()
+
+def reload_catalog():
+    """Load the current compiled catalog (python compile_data.py artifact) and swap it in.
+
+    The new catalog is fully loaded and warmed before the swap, so requests never
+    wait for it. Pathway results are cached under the catalog version, so nothing
+    computed from the old data is served for the new one. Returns (previous, new) version.
+    """
+    global _catalog, _pool
+    with _reload_lock:
+        start = time.perf_counter()
+        previous = get_catalog()
+        try:
+            catalog = load_catalog()
+            catalog.get_course_embeddings(get_model)
+        except Exception as e:
+            _reload.update(state="failed", error=str(e))
+            raise
+        with _catalog_lock:
+            _catalog = catalog
+        if catalog.version != previous.version:
+            for version in list(_jobs_body):
+                if version != catalog.version:
+                    _jobs_body.pop(version, None)
+            # worker processes hold their own catalog - new ones load the new
+            # snapshot, the old ones finish the computations they were given
+            with _pool_lock:
+                if _pool is not None and _pool.mode == "process":
+                    old_pool, _pool = _pool, None
+                    old_pool.shutdown(cancel_pending=False)
+        seconds = time.perf_counter() - start
+        _metrics.observe_stage("catalog_reload", seconds)
+        _reload.update(
+            state="reloaded", version=catalog.version, previous_version=previous.version,
+            seconds=round(seconds, 3), error=None,
+        )
+        return previous.version, catalog.version
+
+def _reload_quietly():
+    try:
+        reload_catalog()
+    except Exception:
+        # recorded in _reload, the old catalog keeps serving
+        pass
+
+# Warm-up state reported by /ready
+_warmup = {"state": "warming_up", "seconds": None, "error": None}
+
+def warm_up():
+    """Load everything the first pathway request would otherwise pay for"""
+    start = time.perf_counter()
+    try:
+        get_catalog().get_course_embeddings(get_model)
+        # the first encode() initializes the model's runtime, do it here rather than in a request
+        get_model().encode("warm-up", convert_to_numpy=True, normalize_embeddings=True)
+    except Exception as e:
+        _warmup.update(state="failed", error=str(e))
+        return
+    _warmup.update(state="ready", seconds=round(time.perf_counter() - start, 3))
+
+# Shared pool for pathway computations - size, queue bound and thread/process
+# mode come from the environment
+_pool = None
+_pool_lock = threading.Lock()
+
+def _init_pool_worker():
+    # process mode: load the catalog once per worker process, not per request
+    get_catalog()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool(
+                    workers=int(os.environ.get("PATHWAY_WORKERS", str(min(4, os.cpu_count() or 1)))),
+                    max_queue=int(os.environ.get("PATHWAY_MAX_QUEUE", "32")),
+                    mode=os.environ.get("PATHWAY_EXECUTOR", "thread"),
+                    initializer=_init_pool_worker,
+                )
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+# LRU of free-text query embeddings, catalog occupations never reach the model
+_query_cache = EmbeddingCache(get_model, maxsize=int(os.environ.get("QUERY_CACHE_SIZE", "1024")))
+
+def get_query_embedding(text):
+    """Embedding for a job query - the precomputed row for a catalog occupation (by title or
+    "Title: Definition"), otherwise the model through the LRU cache"""
+    catalog = get_catalog()
+    idx = catalog.job_index.get(text)
+    if idx is None:
+        idx = catalog.job_query_index.get(text)
+    if idx is not None:
+        return catalog.job_embeddings[idx]
+    return _query_cache.encode(text)
+
+# Computed pathways keyed by (job1, job2, data version), optionally persisted to disk
+_pathway_cache = PathwayCache(
+    maxsize=int(os.environ.get("PATHWAY_CACHE_SIZE", "256")),
+    cache_dir=os.environ.get("PATHWAY_CACHE_DIR") or None,
+)
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
     return {"status": "ok", "service": "pathway-api"}
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe - 503 until the warm-up has loaded the catalog and model"""
+    if _warmup["state"] == "ready":
+        catalog = get_catalog()
+        return {
+            "status": "ready",
+            "version": catalog.version,
+            "skill_index": catalog.skill_index_description,
+            "warmup_seconds": _warmup["seconds"],
+            "reload": _reload,
+        }
+    return not_ready_response()
+
+def not_ready_response():
+    return JSONResponse(
+        {"status": _warmup["state"], "error": _warmup["error"]},
+        status_code=503,
+        headers={"Retry-After": os.environ.get("PATHWAY_RETRY_AFTER", "5")},
+    )
+
+# the job list only changes with the data, browsers may keep it this long and
+# then revalidate with If-None-Match
+JOBS_MAX_AGE = 3600
+_jobs_body = {}
+
 @app.get("/jobs")
-def get_available_jobs():
+def get_available_jobs(request: Request):
     """Get list of all available job titles from detailed_occupations.json"""
     try:
-        with open("detailed_occupations.json", "r", encoding="utf-8") as f:
-            jobs = json.load(f)
-        job_titles = [job["SOC Title"] for job in jobs]
-        return {"jobs": job_titles, "count": len(job_titles)}
+        catalog = get_catalog()
+        etag = pathway_etag(("jobs", catalog.version))
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={JOBS_MAX_AGE}", "Vary": "Accept-Encoding"}
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        body = _jobs_body.get(catalog.version)
+        if body is None:
+            body = _jobs_body[catalog.version] = dumps({"jobs": catalog.job_titles, "count": len(catalog.job_titles)})
+        body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="application/json", headers=headers)
     except Exception as e:
         return {"error": str(e), "jobs": [], "count": 0}
 
+@app.get("/jobs/search")
+def search_jobs(q: str = "", limit: int = 10, offset: int = 0):
+    """Typeahead search over SOC titles, codes and definitions, best matches first"""
+    limit = max(0, min(limit, MAX_SEARCH_LIMIT))
+    offset = max(0, offset)
+    total, results = get_catalog().job_search.search(q, limit, offset)
+    return Response(
+        dumps({"query": q, "total": total, "offset": offset, "limit": limit, "results": results}),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+
+@app.get("/jobs/match")
+def match_jobs(q: str = "", k: int = 10):
+    """Occupations closest to a free-text description (a current role that is not a SOC
+    title, say), by embedding similarity - catalog titles use their precomputed row"""
+    if _warmup["state"] != "ready":
+        return not_ready_response()
+    q = q.strip()
+    if not q:
+        return JSONResponse({"error": "No query given"}, status_code=422)
+    catalog = get_catalog()
+    k = max(0, min(k, MAX_SEARCH_LIMIT, len(catalog.jobs)))
+    scores = catalog.job_embeddings @ get_query_embedding(q)
+    top = np.argsort(-scores, kind="stable")[:k]
+    results = [{"title": catalog.job_titles[row], "score": round(float(scores[row]), 4)} for row in top.tolist()]
+    return {"query": q, "results": results}
+
+@app.get("/degrees/{job}")
+def get_degrees(job: str, k: int = 5):
+    """Degree programs closest to an occupation, with their semester plans - served from the
+    table precomputed with the catalog, no model call"""
+    catalog = get_catalog()
+    idx = catalog.job_index.get(job)
+    if idx is None:
+        return {"error": "Job title not found", "job": job}
+    k = max(0, min(k, catalog.job_degree_ids.shape[1]))
+    programs = [
+        degree_program(catalog.degrees[program_id], score)
+        for program_id, score in zip(catalog.job_degree_ids[idx][:k], catalog.job_degree_scores[idx][:k])
+    ]
+    return Response(
+        dumps({"job": job, "programs": programs}),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={JOBS_MAX_AGE}"},
+    )
+
+@app.get("/transitions/{job}")
+def get_transitions(job: str, n: int = 10):
+    """Most reachable next roles from an occupation - the share of each role's top skills the
+    job already has, with shared and missing skill counts, from the precomputed affinity table"""
+    catalog = get_catalog()
+    idx = catalog.job_index.get(job)
+    if idx is None:
+        return {"error": "Job title not found", "job": job}
+    n = max(0, min(n, catalog.transitions.targets.shape[1]))
+    transitions = [
+        {
+            "title": catalog.job_titles[target],
+            "code": catalog.jobs[target].get("SOC Code", ""),
+            "affinity": round(affinity, 4),
+            "shared_skills": shared,
+            "missing_skills": missing,
+        }
+        for target, affinity, shared, missing in catalog.transitions.nearest(idx, n)
+    ]
+    return Response(
+        dumps({"job": job, "transitions": transitions}),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={JOBS_MAX_AGE}"},
+    )
+
+@app.post("/admin/reload")
+async def admin_reload(request: Request):
+    """Hot-swap to the current compiled catalog. Only enabled when PATHWAY_ADMIN_TOKEN is set,
+    which must then be sent as "Authorization: Bearer <token>"."""
+    token = os.environ.get("PATHWAY_ADMIN_TOKEN")
+    if not token:
+        return JSONResponse({"error": "Not Found"}, status_code=404)
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    try:
+        previous, version = await asyncio.to_thread(reload_catalog)
+    except Exception as e:
+        catalog = await asyncio.to_thread(get_catalog)
+        return JSONResponse({"status": "failed", "error": str(e), "version": catalog.version}, status_code=500)
+    return {"status": "reloaded", "version": version, "previous_version": previous, "changed": version != previous}
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text metrics: per-stage latency histograms, request outcomes, cache hit ratios"""
+    pool = get_pool()
+    body = _metrics.render(
+        caches={"pathway": _pathway_cache.stats(), "query_embedding": _query_cache.stats()},
+        gauges={"pathway_pool_pending": pool.pending, "pathway_ready": int(_warmup["state"] == "ready")},
+    )
+    return Response(body, media_type="text/plain; version=0.0.4")
+
 @app.get("/pathway/{job1}/{job2}")
-async def get_pathway(job1: str, job2: str):
-    """Get pathway between two jobs - runs in background thread pool"""
-    from concurrent.futures import ThreadPoolExecutor
-    import concurrent.futures
-    
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        result = await loop.run_in_executor(executor, lambda: _get_pathway_sync(job1, job2))
-    return result
-
-def _get_pathway_sync(job1: str, job2: str):
-    with open("detailed_occupations.json", "r",  encoding="utf-8") as f:
-        jobs = json.load(f)
-        job1Index = None
-        job2Index = None
-    
+async def get_pathway(job1: str, job2: str, request: Request, trace: bool = False, compact: bool = False):
+    """Get pathway between two jobs - cached, computed in the shared worker pool on a miss.
+    With ?trace=1 the response also carries a per-stage timing breakdown, with
+    ?compact=1 courses are sent once in a "courses" table that nodes index into."""
+    start = time.perf_counter()
+    requestTrace = StageTrace()
+    # async handlers never wait for the catalog lock on the event loop - the
+    # warm-up may hold it for seconds, and /health has to answer meanwhile
+    if _warmup["state"] != "ready":
+        return not_ready_response()
+    catalog = await asyncio.to_thread(get_catalog)
+    key = (job1, job2, catalog.version)
+    etag = pathway_etag(key + ("compact",) if compact else key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        _metrics.observe_request("not_modified", time.perf_counter() - start)
+        return Response(status_code=304, headers=headers)
+
+    outcome = "cached"
+
+    async def compute():
+        nonlocal outcome
+        outcome = "computed"
+        export, stages = await get_pool().run(_get_pathway_sync, job1, job2)
+        for name, (seconds, calls) in stages.items():
+            requestTrace.add(name, seconds, calls)
+            _metrics.observe_stage(name, seconds, calls)
+        return export
+
+    try:
+        result = await _pathway_cache.get_or_compute(key, compute)
+    except Overloaded:
+        _metrics.observe_request("rejected", time.perf_counter() - start)
+        return JSONResponse(
+            {"error": "Server is busy, please retry shortly"},
+            status_code=503,
+            headers={"Retry-After": os.environ.get("PATHWAY_RETRY_AFTER", "5")},
+        )
+
+    with requestTrace.stage("serialization"):
+        if compact and "nodes" in result:
+            result = compact_export(result)
+        body = dumps(result)
+    _metrics.observe_stage("serialization", requestTrace.stages["serialization"][0])
+    if trace:
+        elapsed = time.perf_counter() - start
+        body = dumps({**result, "trace": {"cache": outcome, "total_ms": round(elapsed * 1000, 3), "stages": requestTrace.as_dict()}})
+
+    with requestTrace.stage("compression"):
+        body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+    _metrics.observe_stage("compression", requestTrace.stages["compression"][0])
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    _metrics.observe_request(outcome, time.perf_counter() - start)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/pathway/{job1}/{job2}/stream")
+async def stream_pathway(job1: str, job2: str, request: Request, format: str = "ndjson"):
+    """Streaming variant of /pathway/{job1}/{job2} so the graph can be drawn tier by tier.
+
+    Sends {"type": "tier", "tier", "nodes", "edges"} records - root and foundational
+    first, then medium, niche and applied_hard as each is attached - and ends with
+    {"type": "complete"} (or {"type": "error"}). Newline-delimited JSON by default,
+    server-sent events with ?format=sse or Accept: text/event-stream.
+    """
+    if _warmup["state"] != "ready":
+        return not_ready_response()
+    sse = format == "sse" or "text/event-stream" in request.headers.get("accept", "")
+    return StreamingResponse(
+        _stream_pathway_tiers(job1, job2, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+async def _stream_pathway_tiers(job1, job2, sse):
+    start = time.perf_counter()
+    catalog = await asyncio.to_thread(get_catalog)
+    key = (job1, job2, catalog.version)
+
+    def record(kind, **body):
+        data = dumps({"type": kind, **body})
+        return b"event: " + kind.encode() + b"\ndata: " + data + b"\n\n" if sse else data + b"\n"
+
+    outcome = "cached"
+    streamed = False
+    stages = {}
+    loop = asyncio.get_running_loop()
+    tiers = asyncio.Queue()
+
+    async def compute():
+        nonlocal outcome
+        outcome = "computed"
+        pool = get_pool()
+        on_tier = None
+        if pool.mode == "thread":
+            def on_tier(tier, nodes, edges):
+                loop.call_soon_threadsafe(tiers.put_nowait, (tier, nodes, edges))
+        # process workers cannot call back, their graph is split into tiers once it is done
+        export, run_stages = await pool.run(_get_pathway_sync, job1, job2, on_tier)
+        stages.update(run_stages)
+        return export
+
+    # memory, then disk, then an identical computation already in flight, only
+    # then a new one; its own task, so a client that goes away does not cancel
+    # the computation other requests may be waiting on
+    computation = asyncio.ensure_future(_pathway_cache.get_or_compute(key, compute))
+    computation.add_done_callback(lambda task: task.cancelled() or task.exception())
+    try:
+        while not computation.done() or not tiers.empty():
+            next_tier = asyncio.ensure_future(tiers.get())
+            await asyncio.wait({next_tier, computation}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_tier.done():
+                next_tier.cancel()
+                continue
+            tier, nodes, edges = next_tier.result()
+            streamed = True
+            yield record("tier", tier=tier, nodes=nodes, edges=edges)
+        export = computation.result()
+    except Overloaded:
+        _metrics.observe_request("rejected", time.perf_counter() - start)
+        yield record("error", status=503, error="Server is busy, please retry shortly")
+        return
+    except Exception as e:
+        # the response is already streaming, so report it in-band instead of cutting it off
+        _metrics.observe_request("error", time.perf_counter() - start)
+        yield record("error", status=500, error=str(e))
+        return
+    for name, (seconds, calls) in stages.items():
+        _metrics.observe_stage(name, seconds, calls)
+
+    if "error" in export:
+        yield record("error", status=404, **export)
+    else:
+        if not streamed:
+            for tier, nodes, edges in export_tiers(export):
+                yield record("tier", tier=tier, nodes=nodes, edges=edges)
+        elapsed = time.perf_counter() - start
+        yield record("complete", node_count=len(export["nodes"]), edge_count=len(export["edges"]), cache=outcome, total_ms=round(elapsed * 1000, 3))
+    _metrics.observe_request(outcome, time.perf_counter() - start)
+
+class PathwayPair(BaseModel):
+    from_: str = Field(alias="from")
+    to: str
+
+class PathwayBatch(BaseModel):
+    """Explicit (from, to) pairs, and/or one "from" job against a list of "to" jobs"""
+    pairs: list[PathwayPair] = []
+    from_: str | None = Field(None, alias="from")
+    to: list[str] = []
+    compact: bool = False
+
+@app.post("/pathways")
+async def get_pathways(batch: PathwayBatch):
+    """Compute many pathways in one request, streamed back as NDJSON.
+
+    "from"/"to" are job1/job2 of /pathway/{job1}/{job2}. One line is written per
+    pair as soon as it is ready (so not necessarily in request order):
+    {"index", "from", "to", "status", "result"} or "error" instead of "result".
+    """
+    pairs = [(pair.from_, pair.to) for pair in batch.pairs]
+    if batch.from_ is not None:
+        pairs += [(batch.from_, to) for to in batch.to]
+    if not pairs:
+        return JSONResponse({"error": "No job pairs given"}, status_code=422)
+    if _warmup["state"] != "ready":
+        return not_ready_response()
+    max_pairs = int(os.environ.get("PATHWAY_BATCH_MAX", "100"))
+    if len(pairs) > max_pairs:
+        return JSONResponse({"error": f"At most {max_pairs} pairs per request"}, status_code=413)
+    return StreamingResponse(_stream_pathways(pairs, batch.compact), media_type="application/x-ndjson")
+
+async def _stream_pathways(pairs, compact=False):
+    start = time.perf_counter()
+    catalog = await asyncio.to_thread(get_catalog)
+    pool = get_pool()
+
+    def line(n, status, result=None, **body):
+        job1, job2 = pairs[n]
+        if result is not None:
+            body["result"] = compact_export(result) if compact else result
+        return dumps({"index": n, "from": job1, "to": job2, "status": status, **body}) + b"\n"
+
+    def observe(stages):
+        for name, (seconds, calls) in stages.items():
+            _metrics.observe_stage(name, seconds, calls)
+
+    # pairs that share job1 share the whole skill tree, only the matches differ
+    groups = {}
+    for n, (job1, job2) in enumerate(pairs):
+        job1Index = catalog.job_index.get(job1)
+        job2Index = catalog.job_index.get(job2)
+        if job1Index is None or job2Index is None:
+            yield line(n, 404, error="Job title not found")
+            continue
+        cached = _pathway_cache.get((job1, job2, catalog.version))
+        if cached is not None:
+            yield line(n, 200, result=cached)
+            continue
+        groups.setdefault(job1Index, []).append((n, job2Index))
+
+    if groups:
+        rows = list(dict.fromkeys(row for job1Index, members in groups.items() for row in [job1Index] + [j for _, j in members]))
+        position = {row: p for p, row in enumerate(rows)}
+        busy = "Server is busy, please retry shortly"
+
+        def failure_status(e):
+            if isinstance(e, Overloaded):
+                return 503, busy
+            if isinstance(e, CatalogChanged):
+                # reloaded mid-batch, retrying gets the pairs from the new catalog
+                return 503, str(e)
+            return 500, str(e)
+
+        try:
+            hits, stages = await pool.run(_search_jobs_sync, catalog.version, rows)
+            observe(stages)
+        except Exception as e:
+            status, error = failure_status(e)
+            for members in groups.values():
+                for n, _ in members:
+                    yield line(n, status, error=error)
+            groups = {}
+
+        # one batch does not take more than the pool's workers, so it cannot
+        # crowd out single requests
+        slots = asyncio.Semaphore(pool.workers)
+
+        # a group that fails only fails its own pairs, the others keep streaming
+        async def run_group(job1Index, members):
+            async with slots:
+                try:
+                    exports, stages = await pool.run(
+                        _get_pathways_sync, catalog.version, job1Index,
+                        hits[position[job1Index]], [hits[position[j]] for _, j in members],
+                    )
+                except Exception as e:
+                    return members, None, failure_status(e)
+            observe(stages)
+            return members, exports, None
+
+        tasks = [asyncio.ensure_future(run_group(job1Index, members)) for job1Index, members in groups.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                members, exports, failure = await next_done
+                for m, (n, _) in enumerate(members):
+                    if exports is None:
+                        status, error = failure
+                        yield line(n, status, error=error)
+                        continue
+                    _pathway_cache.put((*pairs[n], catalog.version), exports[m])
+                    yield line(n, 200, result=exports[m])
+        finally:
+            # client went away, do not start the groups that are still waiting
+            for task in tasks:
+                task.cancel()
+    _metrics.observe_request("batch", time.perf_counter() - start)
+
+# Opt-in debug mode: with PATHWAY_DEBUG_DIR set, each computed pathway's learning
+# progression is dumped to its own file there by a background writer thread
+_debug_writer = None
+_debug_writer_lock = threading.Lock()
+
+def _write_debug_dump(debug_dir, dump):
+    os.makedirs(debug_dir, exist_ok=True)
+    path = os.path.join(debug_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dump, f, indent=4, ensure_ascii=False)
+
+def dump_debug_async(dump):
+    global _debug_writer
+    debug_dir = os.environ.get("PATHWAY_DEBUG_DIR")
+    if not debug_dir:
+        return
+    with _debug_writer_lock:
+        if _debug_writer is None:
+            _debug_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pathway-debug")
+    _debug_writer.submit(_write_debug_dump, debug_dir, dump)
+
+def _get_pathway_sync(job1: str, job2: str, on_tier=None):
+    """Worker pool entry point, returns the graph and the stage timings of this run"""
+    trace = StageTrace()
+    export, progression = compute_pathway(job1, job2, trace, on_tier)
+    if progression is not None:
+        dump_debug_async({"job1": job1, "job2": job2, **progression})
+    return export, trace.stages
+
+def _search_jobs_sync(version, job_rows):
+    """Worker pool entry point for a batch - skill search hits for every job row, one matrix query"""
+    trace = StageTrace()
+    hits = search_job_skills(get_catalog_version(version), job_rows)
+    trace.mark("faiss_search")
+    return hits, trace.stages
+
+def _get_pathways_sync(version, job1Index, skill_hits, current_skill_hits):
+    """Worker pool entry point for a batch group - builds job1's tree once and marks
+    each current job's matches on a copy of it, returns the exports in the same order.
+    version is the catalog the batch resolved its job rows against"""
+    trace = StageTrace()
+    catalog = get_catalog_version(version)
+    export, progression = build_pathway(catalog, job1Index, skill_hits, trace)
+    exports = [with_matches(catalog, export, hits[:100]) for hits in current_skill_hits]
+    trace.mark("tree_assembly")
+    dump_debug_async({"job1": catalog.job_titles[job1Index], **progression})
+    return exports, trace.stages
+
+def search_job_skills(catalog, job_rows):
+    """Top 300 skill rows for each job row, searched as one FAISS matrix query.
+    Approximate indexes may pad a row with -1."""
+    # catalog occupations always have their precomputed embedding row
+    d , i = catalog.skill_search_index.search(catalog.job_embeddings[job_rows], k=300)
+    return i
+
+def current_skills(catalog, current_skill_rows):
+    return {catalog.skills[row] for row in current_skill_rows if row >= 0}
+
+def match_nodes(nodes, current):
+    """Nodes with match set on the ones that are among the current job's skills (copies, the input is not modified)"""
+    return [{**node, "match": True} if node["skill_name"] in current else node for node in nodes]
+
+def with_matches(catalog, export, current_skill_rows):
+    """Copy of export with the current job's matches marked"""
+    return {"nodes": match_nodes(export["nodes"], current_skills(catalog, current_skill_rows)), "edges": export["edges"]}
+
+def tier_node(node):
+    """A node as it will look in the finished export, for sending it before traverse() has run"""
+    return {**node, "connections": None, "id": node["skill_name"], "label": ""}
+
+TIERS = ("foundational", "medium", "niche", "applied_hard")
+
+def export_tiers(export):
+    """Split a finished export into (tier, nodes, edges) by depth in the tree, the root
+    going with the foundational tier - the same records compute_pathway() streams"""
+    depth = {"root": 0}
+    # edges are in traversal order, so a parent's depth is known before its children's
+    for edge in export["edges"]:
+        depth[edge["to"]] = depth[edge["from"]] + 1
+    tiers = []
+    for level, tier in enumerate(TIERS, start=1):
+        nodes = [node for node in export["nodes"] if max(depth.get(node["id"], 0), 1) == level]
+        edges = [edge for edge in export["edges"] if depth[edge["to"]] == level]
+        tiers.append((tier, nodes, edges))
+    return tiers
+
+def compute_pathway(job1: str, job2: str, trace=None, on_tier=None):
+    """Compute the pathway graph between two jobs without touching the filesystem.
+
+    Returns (export, progression) where export is the node/edge graph (or an error
+    dict) and progression holds the intermediate learning-progression categories
+    as skill names, or None when the jobs were not found. Stage timings are
+    recorded into trace (a StageTrace) when one is given. on_tier(tier, nodes, edges)
+    is called as each tier of the tree is attached, with the nodes in their final
+    export form.
+    """
+    if trace is None:
+        trace = StageTrace()
+    catalog = get_catalog()
+
     # Find the indices of the jobs
-    for idx, job in enumerate(jobs):
-        if job["SOC Title"] == job1:
-            job1Index = idx
-        if job["SOC Title"] == job2:
-            job2Index = idx
-    
+    job1Index = catalog.job_index.get(job1)
+    job2Index = catalog.job_index.get(job2)
+
     # If jobs not found, return error
     if job1Index is None or job2Index is None:
-        return {"error": "Job title not found", "job1": job1, "job2": job2}
-
+        return {"error": "Job title not found", "job1": job1, "job2": job2}, None
+    trace.mark("setup")
+
+    # job1's skills build the tree, job2's top 100 skills only mark the matching nodes
+    i = search_job_skills(catalog, [job1Index, job2Index])
+    trace.mark("faiss_search")
+    current = current_skills(catalog, i[1][:100])
+    tierCallback = None
+    if on_tier is not None:
+        def tierCallback(tier, nodes, edges):
+            on_tier(tier, match_nodes(nodes, current), edges)
+    export, progression = build_pathway(catalog, job1Index, i[0], trace, tierCallback)
+    export = {"nodes": match_nodes(export["nodes"], current), "edges": export["edges"]}
+    trace.mark("tree_assembly")
+    return export, progression
+
+def build_pathway(catalog, job1Index, skill_hits, trace, on_tier=None):
+    """Skill tree for job1 from its skill search hits, with every node's match still False.
+
+    Returns (export, progression) and calls on_tier, see compute_pathway().
+    """
     #for cos similarity
     def objectiveSkillIndex(skillName):
-        with open("skillOrder.json", "r") as f:
-            skills = json.load(f)
-        for index, skill in enumerate(skills):
-            if skill == skillName:
-                return index
-
-    # i used chatgpt for this formula, this determines semantic distances
-    def distance(embed1, embed2):
-        return np.dot(embed1, embed2) / (np.linalg.norm(embed1) * np.linalg.norm(embed2))
+        return catalog.skill_index.get(skillName)
 
     jobSkills = []
     skills = []
     commonOccurring = {}
 
-    def getCourses(skill):
-        courseList = []
-        with open("courses.json", "r") as f:
-            courseSet = json.load(f)
-        for course in courseSet:
-            if course.get("skills"):
-                if skill in course["skills"]:
-                    courseList.append(course)
-        return courseList
-
-
-    def outputJson(jsonFile, jsonName):
-        with open(jsonName, "w") as f:
-            json.dump(jsonFile, f, indent=4, default=convert)
-
-    with open("skillOrder.json", "r") as f:
-        skills = json.load(f)
-
-    embeddings = np.load("skill_embeddings2.npy")
-
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings)
-
-    query = "Web and Digital Interface Designers: Design digital user interfaces or websites. Develop and test layouts, interfaces, functionality, and navigation menus to ensure compatibility and usability across browsers or devices. May use web framework applications as well as client-side code and processes. May evaluate web design following web and accessibility standards, and may analyze web use metrics and optimize websites for marketability and search engine ranking. May design and test interfaces that facilitate the human-computer interaction and maximize the usability of digital devices, websites, and software with a focus on aesthetics and design. May create graphics used in websites and manage website content and links. Excludes “Special Effects Artists and Animators” (27-1014) and “Graphic Designers” (27-1024)."
-
-    
-    print(f"{jobs[job1Index]['SOC Title']}: {jobs[job1Index]['SOC Definition']}")
-
-    query = f"{jobs[job1Index]['SOC Title']}: {jobs[job1Index]['SOC Definition']}"
-    query2 = f"{jobs[job2Index]['SOC Title']}: {jobs[job2Index]['SOC Definition']}"
-
-    queryEncoded = get_model().encode(query, normalize_embeddings=True)
-    queryCurrentEncoded = get_model().encode(query2, normalize_embeddings=True)
-
-
-    if len(queryEncoded.shape) == 1:
-        queryEncoded = queryEncoded.reshape(1, -1)
-        d , i = index.search(queryEncoded, k=300)
-        for idx in i[0]:
-            #check to see size of node tree
-            if len(jobSkills) > 60:
-                break
-            skillDict = {}
-            skillDict["skill_name"] = skills[idx]
-            courses = getCourses(skills[idx])
-            #if no courses, move on
-            if len(courses) <= 0:
-                continue
-            skillDict["courses"] = courses
-            jobSkills.append(skillDict)
-
-    oldJobSkills = []
+    skills = catalog.skills
 
-    if len(queryCurrentEncoded.shape) == 1:
-        queryCurrentEncoded = queryCurrentEncoded.reshape(1, -1)
-        d , i = index.search(queryCurrentEncoded, k=100)
-        for index2 in i[0]:
-            skillDict = {}
-            skillDict["skill_name"] = skills[index2]
+    embeddings = catalog.skill_embeddings
+    job_embeddings = catalog.job_embeddings
 
-            oldJobSkills.append(skillDict)
+    #skip skills without courses and cap the size of the node tree at 61
+    found = skill_hits[skill_hits >= 0]
+    hits = found[catalog.skill_course_counts[found] > 0][:61]
+    for idx in hits:
+        skillDict = {}
+        skillDict["skill_name"] = skills[idx]
+        skillDict["courses"] = catalog.get_courses(idx)
+        jobSkills.append(skillDict)
+    trace.mark("course_filtering")
 
-    print(oldJobSkills)
     #copy dictionary twice for dual processing and aggregate (importance + foundational level)
     skillListImportance = [skill["skill_name"] for skill in jobSkills]
-    skillListFoundational = copy.deepcopy(jobSkills)
+    skillListFoundational = list(jobSkills)
 
     skillListFoundational.sort(key=lambda skill:len(skill["courses"]), reverse=True)
 
     aggregate = []
 
     forProcessing = {}
-    forProcessing["importance"] = []
-    forProcessing["angle"] = []
-
-    def convert(obj):
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()              # Convert arrays to lists
-        if isinstance(obj, (np.float32, np.float64)):
-            return float(obj)                # Convert NumPy floats to Python float
-        if isinstance(obj, (np.int32, np.int64)):
-            return int(obj)                  # Convert NumPy ints to Python int
-        raise TypeError(f"Type {type(obj)} not serializable")
 
 
-    for skill in skillListImportance:
-        forProcessing["importance"].append(skill)
-        skillEmbed = embeddings[objectiveSkillIndex(skill)]
-        new_embed = get_model().encode(query, convert_to_numpy=True, normalize_embeddings=True)
-        skillDistance = distance(skillEmbed, new_embed)
-        forProcessing["angle"].append(skillDistance)
 
-
-    # ------------------ PATHS ------------------
-    skill_graph_path = "courses_with_skills.json"
-    output_path = "learning_progression.json"
+    forProcessing["importance"] = list(skillListImportance)
+    importanceEmbeddings = embeddings[[objectiveSkillIndex(skill) for skill in skillListImportance]]
+    jobEmbedding = job_embeddings[job1Index]
+    forProcessing["angle"] = list(importanceEmbeddings @ jobEmbedding / (np.linalg.norm(importanceEmbeddings, axis=1) * np.linalg.norm(jobEmbedding)))
 
 
     # ------------------ INPUT LIST ------------------
@@ -207,55 +831,33 @@ def _get_pathway_sync(job1: str, job2: str):
     # ------------------ PARAMETERS ------------------
     alpha = 0.1  # weight for disagreement penalty
 
-    # ------------------ STEP 1: LOAD SKILL GRAPH ------------------
-    with open(skill_graph_path, "r", encoding="utf-8") as f:
-        skill_graph = json.load(f)
-        skill_graph = skill_graph["skills_to_courses"]
-    # Build a mapping of which skills share courses
-    skill_graph_skills = {skill: set() for skill in skill_graph}
-
-    # Reverse map: course -> skills
-    course_to_skills = {}
-    for skill, courses in skill_graph.items():
-        for course in courses:
-            course_to_skills.setdefault(course, set()).add(skill)
-
-    # Build skill-to-skill connections
-    for skill, courses in skill_graph.items():
-        connected_skills = set()
-        for course in courses:
-            connected_skills.update(course_to_skills[course])
-        connected_skills.discard(skill)  # remove self-loop
-        skill_graph_skills[skill] = list(connected_skills)
+    # ------------------ STEP 1: SKILL GRAPH ------------------
+    # prebuilt once by the catalog as a CSR adjacency over skillOrder rows
+
     # ------------------ STEP 2: BUILD SUBGRAPH ------------------
-    subgraph = {}
-    for skill in input_skills:
-        if skill in skill_graph_skills:
-            subgraph[skill] = [s for s in skill_graph_skills[skill] if s in input_skills]
+    # unique input skills that are in the skill graph, in first-seen order
+    subgraph_skills = [s for s in dict.fromkeys(input_skills) if catalog.in_skill_graph[catalog.skill_index[s]]]
+    subgraph = catalog.skill_subgraph([catalog.skill_index[s] for s in subgraph_skills])
 
     # ------------------ STEP 3: PRUNE NODES WITH NO CONNECTIONS ------------------
+    kept = np.ones(len(subgraph_skills), dtype=bool)
     while True:
-
-        no_edge_nodes = [skill for skill, neighbors in subgraph.items() if len(neighbors) == 0]
-        if not no_edge_nodes:
+        degree = subgraph[:, kept].sum(axis=1)
+        no_edge_nodes = kept & (degree == 0)
+        if not no_edge_nodes.any():
             break
-        for n in no_edge_nodes:
-            del subgraph[n]
-        for skill in list(subgraph.keys()):
-            subgraph[skill] = [s for s in subgraph[skill] if s in subgraph]
+        kept &= ~no_edge_nodes
+    pruned_skills = {skill for skill, keep in zip(subgraph_skills, kept) if keep}
 
     # ------------------ STEP 4: PRUNED SKILLS IN ORIGINAL ORDER ------------------
-    pruned_skills_in_input_order = [s for s in input_skills if s in subgraph]
+    pruned_skills_in_input_order = [s for s in input_skills if s in pruned_skills]
 
     # ------------------ STEP 5: SORTED BY DEGREE ------------------
-    pruned_skills_sorted_by_degree = sorted(
-        [
-            {"skill": skill, "degree": len(neighbors), "edges": neighbors}
-            for skill, neighbors in subgraph.items()
-        ],
-        key=lambda x: x["degree"],
-        reverse=True
-    )
+    kept_rows = np.flatnonzero(kept)
+    pruned_skills_sorted_by_degree = [
+        {"skill": subgraph_skills[row], "degree": int(degree[row])}
+        for row in kept_rows[np.argsort(-degree[kept_rows], kind="stable")]
+    ]
 
     # ------------------ STEP 6: INDEX MAPS ------------------
     index_input = {skill: i for i, skill in enumerate(pruned_skills_in_input_order)}
@@ -309,41 +911,37 @@ def _get_pathway_sync(job1: str, job2: str):
 
     output["categories"] = categories
 
-    # ------------------ STEP 9: SAVE JSON ------------------
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
+    # ------------------ STEP 9: KEEP THE PROGRESSION ------------------
+    # the category lists are replaced by full skill dicts below, keep the names
+    progression = {"categories": {category: list(names) for category, names in categories.items()}}
 
 
     #aggregate data from 2 lists
+    # last position wins, as in the old scan over skillListFoundational
+    foundationalIndex = {skill["skill_name"]: index for index, skill in enumerate(skillListFoundational)}
     for index, skill in enumerate(skillListImportance):
         skillDict = {}
         skillDict["skill_name"] = skill
         skillDict["importance_index"] = index
-        for index, skill2 in enumerate(skillListFoundational):
-            if skill2["skill_name"] == skillDict["skill_name"]:
-                skillDict["foundational_index"] = index
+        skillDict["foundational_index"] = foundationalIndex[skill]
         #weight * sum * variance
         skillDict["learning_rate"] = 0.1 * (abs(skillDict["importance_index"] - skillDict["foundational_index"])) * (skillDict["importance_index"] + skillDict["foundational_index"])
         aggregate.append(skillDict)
 
     aggregate.sort(key=lambda skill:skill["learning_rate"])
+    trace.mark("graph_building")
 
-    #returns skill dict given skill name
+    #returns skill dict given skill name, the first one like the old scan over jobSkills
+    jobSkillsByName = {}
+    for skill in jobSkills:
+        jobSkillsByName.setdefault(skill["skill_name"], skill)
     def searchSkill(skillname):
-        for skill in jobSkills:
-            if skill["skill_name"] == skillname:
-                return skill
+        return jobSkillsByName.get(skillname)
 
-    #pulls the whole skill (not for official use, for partial use)
+    #pulls the description fields of a skill from the compiled skillsRSD store
     def skillPull(skillName):
-        for root, dirs, files in os.walk("skillsRSD"):
-            for filename in files:
-                path = os.path.join(root, filename)
-                with open(path, "r") as f:
-                    skillCollection = json.load(f)
-                for skill in skillCollection:
-                    if skill["RSD Name"] == skillName:
-                        return skill
+        with trace.stage("rsd_lookup"):
+            return catalog.rsd.get(skillName)
 
     #this is the entire thing
     skillNet = []
@@ -356,125 +954,90 @@ def _get_pathway_sync(job1: str, job2: str):
     root["skill_name"] = "root"
     skillNet.append(root)
 
-    job_embeddings = np.load("job_embeddings.npy")
-    with open("detailed_occupations.json", "r", encoding="utf-8") as f:
-        job_list = json.load(f)
-
-    def rankCourses(courses, job):
-        m = get_model()  # Get the model (lazy loaded if needed)
-        newCourses = []
-        highestCourse = {}
-        counter = -100
-        for course in courses:
-            course_embed = get_model().encode(f"{course['course_title']}: {course['course_desc']}", convert_to_numpy=True, normalize_embeddings=True)
-            distanceOfCourse = distance(job_embeddings[job], course_embed)
-            if distanceOfCourse >= 0.5:
-                newCourses.append(course)
-            if distanceOfCourse > counter:
-                highestCourse = course
-                counter = distanceOfCourse
-        if len(newCourses) == 0:
-            newCourses.append(highestCourse)
-        return newCourses
-
-    for i, value in enumerate(output["categories"]["foundational"]):
-        officialSkill = copy.deepcopy(searchSkill(value))
-        skillSpine = skillPull(value)
-        officialSkill["description"] = skillSpine["Skill Statement"]
-        officialSkill["alignment"] = skillSpine["Alignment Name"]
-        officialSkill["connections"] = []
-        officialSkill["match"] = False
-        officialSkill["courses"] = rankCourses(officialSkill["courses"], job1Index)
-        output["categories"]["foundational"][i] = officialSkill
-    for i, value in enumerate(output["categories"]["medium"]):
-        officialSkill = copy.deepcopy(searchSkill(value))
-        skillSpine = skillPull(value)
-        officialSkill["description"] = skillSpine["Skill Statement"]
-        officialSkill["alignment"] = skillSpine["Alignment Name"]
-        officialSkill["connections"] = []
-        officialSkill["match"] = False
-        officialSkill["courses"] = rankCourses(officialSkill["courses"], job1Index)
-        output["categories"]["medium"][i] = officialSkill
-    for i, value in enumerate(output["categories"]["niche"]):
-        officialSkill = copy.deepcopy(searchSkill(value))
-        skillSpine = skillPull(value)
-        officialSkill["description"] = skillSpine["Skill Statement"]
-        officialSkill["alignment"] = skillSpine["Alignment Name"]
-        officialSkill["connections"] = []
-        officialSkill["match"] = False
-        officialSkill["courses"] = rankCourses(officialSkill["courses"], job1Index)
-        output["categories"]["niche"][i] = officialSkill
-    for i, value in enumerate(output["categories"]["applied_hard"]):
-        officialSkill = copy.deepcopy(searchSkill(value))
-        skillSpine = skillPull(value)
-        officialSkill["description"] = skillSpine["Skill Statement"]
-        officialSkill["alignment"] = skillSpine["Alignment Name"]
-        officialSkill["connections"] = []
-        officialSkill["match"] = False
-        officialSkill["courses"] = rankCourses(officialSkill["courses"], job1Index)
-        output["categories"]["applied_hard"][i] = officialSkill
-
-    offLearningRate = 0
 
-    added = []
+    with trace.stage("course_ranking"):
+        course_embeddings = catalog.get_course_embeddings(get_model)
 
+    # keeps every course with similarity >= 0.5 to the job, or the single closest one
+    def rankCourses(courses, courseIds, job):
+        with trace.stage("course_ranking"):
+            similarity = course_embeddings[courseIds] @ job_embeddings[job]
+            keep = np.flatnonzero(similarity >= 0.5)
+            if len(keep) == 0:
+                keep = [int(np.argmax(similarity))]
+            return [courses[k] for k in keep]
 
-#r
-
+    offLearningRate = 0
 
+    added = set()
+
+    # each tier gets its node details and is then attached below its closest
+    # skill of the tier above, so a streaming caller can send it right away
+    def tierAttached(tier, tierEdges):
+        if on_tier is not None:
+            tierNodes = output["categories"][tier]
+            if tier == "foundational":
+                tierNodes = [root] + tierNodes
+            on_tier(tier, [tier_node(node) for node in tierNodes], tierEdges)
+
+    def nodeDetails(tier):
+        for i, value in enumerate(output["categories"][tier]):
+            # shallow - course dicts are shared with the catalog and never modified
+            officialSkill = dict(searchSkill(value))
+            skillSpine = skillPull(value)
+            officialSkill["description"] = skillSpine["Skill Statement"]
+            officialSkill["alignment"] = skillSpine["Alignment Name"]
+            officialSkill["connections"] = []
+            officialSkill["match"] = False
+            officialSkill["courses"] = rankCourses(officialSkill["courses"], catalog.course_ids(catalog.skill_index[value]), job1Index)
+            output["categories"][tier][i] = officialSkill
+        trace.mark("node_details")
+
+    # the closest (cosine) skill of the tier above for every skill of a tier,
+    # one matrix product and argmax per tier instead of a cosine per skill pair
+    def closestParents(tierSkills, parentSkills):
+        if not tierSkills:
+            return []
+        tierEmbeddings = embeddings[[objectiveSkillIndex(skill["skill_name"]) for skill in tierSkills]]
+        parentEmbeddings = embeddings[[objectiveSkillIndex(skill["skill_name"]) for skill in parentSkills]]
+        similarity = (tierEmbeddings @ parentEmbeddings.T) / np.outer(
+            np.linalg.norm(tierEmbeddings, axis=1), np.linalg.norm(parentEmbeddings, axis=1)
+        )
+        # argmax keeps the first of equally close parents, like the old strict > scan
+        return [parentSkills[j] for j in np.argmax(similarity, axis=1)]
+
+    nodeDetails("foundational")
+    tierEdges = []
     for skill in output["categories"]["foundational"]:
         if skill["skill_name"] not in added:
-            added.append("skill_name")
+            added.add("skill_name")
             root["connections"].append(skill)
-    for skill in output["categories"]["medium"]:
-        smallestSimilarity = -1000000
-        closestNode = None
-        skillEmbedding = embeddings[objectiveSkillIndex(skill["skill_name"])]
-        for foundationSkill in output["categories"]["foundational"]:
-            foundationSkillEmbedding = embeddings[objectiveSkillIndex(foundationSkill["skill_name"])]
-            semanticDistance = distance(skillEmbedding, foundationSkillEmbedding)
-            if semanticDistance > smallestSimilarity:
-                smallestSimilarity = semanticDistance
-                closestNode = foundationSkill
-        if skill["skill_name"] not in added:
-            added.append("skill_name")
-            closestNode["connections"].append(skill)
-    for skill in output["categories"]["niche"]:
-        smallestSimilarity = -1000000
-        closestNode = None
-        skillEmbedding = embeddings[objectiveSkillIndex(skill["skill_name"])]
-        for foundationSkill in output["categories"]["medium"]:
-            foundationSkillEmbedding = embeddings[objectiveSkillIndex(foundationSkill["skill_name"])]
-            semanticDistance = distance(skillEmbedding, foundationSkillEmbedding)
-            if semanticDistance > smallestSimilarity:
-                smallestSimilarity = semanticDistance
-                closestNode = foundationSkill
-        if skill["skill_name"] not in added:
-            added.append("skill_name")
-            closestNode["connections"].append(skill)
-    for skill in output["categories"]["applied_hard"]:
-        smallestSimilarity = -1000000
-        closestNode = None
-        skillEmbedding = embeddings[objectiveSkillIndex(skill["skill_name"])]
-        for foundationSkill in output["categories"]["niche"]:
-            foundationSkillEmbedding = embeddings[objectiveSkillIndex(foundationSkill["skill_name"])]
-            semanticDistance = distance(skillEmbedding, foundationSkillEmbedding)
-            if semanticDistance > smallestSimilarity:
-                smallestSimilarity = semanticDistance
-                closestNode = foundationSkill
-        if skill["skill_name"] not in added:
-            added.append("skill_name")
-            closestNode["connections"].append(skill)
+            tierEdges.append({"from": "root", "to": skill["skill_name"]})
+    trace.mark("tree_assembly")
+    tierAttached("foundational", tierEdges)
+
+    for parentTier, tier in zip(TIERS, TIERS[1:]):
+        nodeDetails(tier)
+        tierEdges = []
+        tierSkills = output["categories"][tier]
+        for skill, closestNode in zip(tierSkills, closestParents(tierSkills, output["categories"][parentTier])):
+            if skill["skill_name"] not in added:
+                added.add("skill_name")
+                closestNode["connections"].append(skill)
+                tierEdges.append({"from": closestNode["skill_name"], "to": skill["skill_name"]})
+        trace.mark("tree_assembly")
+        tierAttached(tier, tierEdges)
+
     #official skill = object we will send through GET request
 
     nodes = []
     edges = []
-    visited = []
+    visited = set()
     def traverse(node):
         
         if node["skill_name"] in visited:
             return
-        visited.append(node["skill_name"])
+        visited.add(node["skill_name"])
         node["id"] = node["skill_name"]
         node["label"] = ""
         nodes.append(node)
@@ -490,12 +1053,7 @@ def _get_pathway_sync(job1: str, job2: str):
 
     export = {"nodes": nodes, "edges": edges}   
 
-    for node in nodes:
-        for skill in oldJobSkills:
-            if skill["skill_name"] == node["skill_name"]:
-                node["match"] = True
-
-    return export
+    return export, progression
     #for skill in jobSkills:
     # for course in skill["courses"]:
             #check to see course
@@ -0,0 +1,149 @@
+"""Lightweight stage timing for the pathway pipeline, exported as Prometheus text.
+
+A StageTrace collects how long each named stage of one request took (stages
+that run once per skill, like the RSD lookup, accumulate). Straight-line code
+uses mark(name), which books the time since the previous mark; helpers that
+run inside such a section use `with trace.stage(name)` and their time is
+subtracted from the enclosing mark, so nothing is counted twice.
+
+The trace is plain data, so it also comes back from a worker process. Metrics
+folds the stage timings into per-stage histograms and call counters and
+renders everything for /metrics.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageTrace:
+    def __init__(self):
+        # stage -> [seconds, calls], in the order stages first ran
+        self.stages = {}
+        self._last_mark = time.perf_counter()
+        self._nested = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._nested += seconds
+            self.add(name, seconds)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.add(name, now - self._last_mark - self._nested)
+        self._last_mark = now
+        self._nested = 0.0
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def as_dict(self):
+        return {
+            name: {"ms": round(seconds * 1000, 3), "calls": calls}
+            for name, (seconds, calls) in self.stages.items()
+        }
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.request_seconds = Histogram()
+        self.requests = {}
+
+    def observe_stage(self, name, seconds, calls=1):
+        with self._lock:
+            self.stage_seconds.setdefault(name, Histogram()).observe(seconds)
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + calls
+
+    def observe_request(self, outcome, seconds):
+        with self._lock:
+            self.request_seconds.observe(seconds)
+            self.requests[outcome] = self.requests.get(outcome, 0) + 1
+
+    def _histogram_lines(self, name, histogram, **labels):
+        lines = []
+        for bound, count in zip(BUCKETS, histogram.counts):
+            lines.append(f"{name}_bucket{{{_labels(**labels, le=bound)}}} {count}")
+        lines.append(f"{name}_bucket{{{_labels(**labels, le='+Inf')}}} {histogram.count}")
+        suffix = f"{{{_labels(**labels)}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+        return lines
+
+    def render(self, caches=None, gauges=None):
+        """Prometheus text exposition. caches maps a cache name to its stats()
+        dict (hits/misses counters), gauges maps a metric name to a value."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP pathway_stage_seconds Time spent in each pathway pipeline stage per request")
+            lines.append("# TYPE pathway_stage_seconds histogram")
+            for name, histogram in self.stage_seconds.items():
+                lines.extend(self._histogram_lines("pathway_stage_seconds", histogram, stage=name))
+
+            lines.append("# HELP pathway_stage_calls_total Number of times each pipeline stage ran")
+            lines.append("# TYPE pathway_stage_calls_total counter")
+            for name, calls in self.stage_calls.items():
+                lines.append(f"pathway_stage_calls_total{{{_labels(stage=name)}}} {calls}")
+
+            lines.append("# HELP pathway_request_seconds End-to-end pathway request latency")
+            lines.append("# TYPE pathway_request_seconds histogram")
+            lines.extend(self._histogram_lines("pathway_request_seconds", self.request_seconds))
+
+            lines.append("# HELP pathway_requests_total Pathway requests by outcome")
+            lines.append("# TYPE pathway_requests_total counter")
+            for outcome, count in self.requests.items():
+                lines.append(f"pathway_requests_total{{{_labels(outcome=outcome)}}} {count}")
+
+        if caches:
+            lines.append("# HELP pathway_cache_hits_total Cache hits")
+            lines.append("# TYPE pathway_cache_hits_total counter")
+            for name, stats in caches.items():
+                lines.append(f"pathway_cache_hits_total{{{_labels(cache=name)}}} {stats['hits'] + stats.get('disk_hits', 0)}")
+            lines.append("# HELP pathway_cache_misses_total Cache misses")
+            lines.append("# TYPE pathway_cache_misses_total counter")
+            for name, stats in caches.items():
+                lines.append(f"pathway_cache_misses_total{{{_labels(cache=name)}}} {stats['misses']}")
+            lines.append("# HELP pathway_cache_hit_ratio Share of lookups answered from the cache")
+            lines.append("# TYPE pathway_cache_hit_ratio gauge")
+            for name, stats in caches.items():
+                hits = stats["hits"] + stats.get("disk_hits", 0)
+                total = hits + stats["misses"]
+                lines.append(f"pathway_cache_hit_ratio{{{_labels(cache=name)}}} {hits / total if total else 0.0:.6f}")
+            lines.append("# HELP pathway_cache_entries Entries currently held in memory")
+            lines.append("# TYPE pathway_cache_entries gauge")
+            for name, stats in caches.items():
+                lines.append(f"pathway_cache_entries{{{_labels(cache=name)}}} {stats['size']}")
+
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,136 @@
+"""Cache of computed pathways.
+
+A pathway only depends on (job1, job2) and the reference data, so results are
+keyed by (job1, job2, catalog.version). There are two tiers:
+
+- an in-memory LRU with a size cap
+- an optional directory of JSON files that survives restarts (PATHWAY_CACHE_DIR)
+
+Identical requests that arrive while a pathway is being computed wait on the
+same in-flight computation instead of starting their own.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def cache_key_digest(key):
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def pathway_etag(key):
+    # results are deterministic per key, so the ETag does not need the body
+    return f'"{cache_key_digest(key)[:32]}"'
+
+
+class PathwayCache:
+    def __init__(self, maxsize=256, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, cache_key_digest(key) + ".json")
+
+    def _disk_get(self, key):
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return value
+
+    def _disk_put(self, key, value):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _load_or_compute(self, key, compute):
+        loop = asyncio.get_running_loop()
+        if self.cache_dir:
+            value = await loop.run_in_executor(None, self._disk_get, key)
+            if value is not None:
+                return value
+
+        with self._lock:
+            self.misses += 1
+        value = await compute()
+
+        if self.cache_dir:
+            await loop.run_in_executor(None, self._disk_put, key, value)
+        return value
+
+    async def get_or_compute(self, key, compute):
+        """Return the cached value for key, or await compute() (a coroutine
+        function) once for all concurrent callers asking for the same key."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load_or_compute(key, compute)
+        except BaseException as e:
+            future.set_exception(e)
+            # mark it retrieved so nobody-waiting does not log a warning
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,164 @@
+"""Compiled, memory-mapped lookup table for the skillsRSD collection.
+
+skillsRSD is ~150 JSON files (31 MB) and the pathway only ever needs two fields
+of a skill: its "Skill Statement" and "Alignment Name". compile_rsd_store()
+flattens the collection once into a single file:
+
+    header   magic, format version, record count, string blob offset and a
+             digest of the source files' names, sizes and mtimes
+    records  one fixed 36-byte record per unique RSD Name
+             (name, statement and alignment as offset/length into the blob)
+    blob     the UTF-8 strings
+
+RSDStore memory-maps that file, builds a name -> record dict from the name
+slices and answers lookups by slicing just the two strings it needs.
+open_or_compile() recompiles the store when the digest no longer matches the
+source directory, so an edited skillsRSD file is picked up on the next start.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"RSDS"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sIIQ32s")
+RECORD = np.dtype([
+    ("name_off", "<u8"), ("name_len", "<u4"),
+    ("statement_off", "<u8"), ("statement_len", "<u4"),
+    ("alignment_off", "<u8"), ("alignment_len", "<u4"),
+])
+
+DEFAULT_SOURCE = "skillsRSD"
+DEFAULT_STORE = "skillsRSD.bin"
+
+
+def iter_rsd_skills(src_dir=DEFAULT_SOURCE):
+    """Yield every skill of the collection in the order the old skillPull() scanned them."""
+    for root, dirs, files in os.walk(src_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            with open(path, "r", encoding="utf-8") as f:
+                skillCollection = json.load(f)
+            for skill in skillCollection:
+                yield skill
+
+
+def source_digest(src_dir=DEFAULT_SOURCE):
+    """sha256 over the (path, size, mtime) of every file in the collection."""
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            stat = os.stat(path)
+            hasher.update(f"{os.path.relpath(path, src_dir)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return hasher.digest()
+
+
+def stored_source_digest(path):
+    """The source digest in a store's header, or None if it is missing or another format."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, _, _, digest = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return digest if magic == MAGIC and version == FORMAT_VERSION else None
+
+
+def compile_rsd_store(src_dir=DEFAULT_SOURCE, out_path=DEFAULT_STORE):
+    """Compile skillsRSD into a store file, returns the number of records written.
+
+    A name that shows up in several files keeps its first occurrence, which is
+    the one skillPull() used to return.
+    """
+    digest = source_digest(src_dir)
+    blob = bytearray()
+    records = []
+    seen = set()
+
+    def add(text):
+        data = text.encode("utf-8")
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    for skill in iter_rsd_skills(src_dir):
+        name = skill["RSD Name"]
+        if name in seen:
+            continue
+        seen.add(name)
+        records.append(add(name) + add(skill.get("Skill Statement", "")) + add(skill.get("Alignment Name", "")))
+
+    table = np.array(records, dtype=RECORD)
+    blob_offset = HEADER.size + table.nbytes
+    # per process - several workers may recompile a stale store at the same time
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(table), blob_offset, digest))
+            f.write(table.tobytes())
+            f.write(blob)
+        os.replace(tmp_path, out_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(table)
+
+
+class RSDStore:
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, blob_offset, self.source_digest = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} RSD store")
+        self._records = np.frombuffer(self._mm, dtype=RECORD, count=count, offset=HEADER.size)
+        self._blob_offset = blob_offset
+        self._index = {
+            self._text(off, length): i
+            for i, (off, length) in enumerate(zip(self._records["name_off"].tolist(), self._records["name_len"].tolist()))
+        }
+
+    @classmethod
+    def open_or_compile(cls, path=DEFAULT_STORE, src_dir=DEFAULT_SOURCE):
+        """The store at path, compiled first if it is missing or older than the source files.
+        Without a source directory the existing store is used as it is."""
+        stale = not os.path.exists(path)
+        if not stale and os.path.isdir(src_dir):
+            stale = stored_source_digest(path) != source_digest(src_dir)
+        if stale:
+            try:
+                compile_rsd_store(src_dir, path)
+            except OSError:
+                # read-only data directory, compile into the temp dir instead
+                path = os.path.join(tempfile.gettempdir(), f"skillsRSD-{os.getpid()}.bin")
+                compile_rsd_store(src_dir, path)
+        return cls(path)
+
+    def _text(self, offset, length):
+        start = self._blob_offset + int(offset)
+        return self._mm[start:start + int(length)].decode("utf-8")
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def get(self, name):
+        """Return {"Skill Statement", "Alignment Name"} for an RSD Name, or None."""
+        i = self._index.get(name)
+        if i is None:
+            return None
+        record = self._records[i]
+        return {
+            "Skill Statement": self._text(record["statement_off"], record["statement_len"]),
+            "Alignment Name": self._text(record["alignment_off"], record["alignment_len"]),
+        }
@@ -0,0 +1,105 @@
+"""Response encoding for the pathway API.
+
+dumps() uses orjson when it is installed (it serializes numpy arrays and
+scalars natively) and falls back to the stdlib encoder with a numpy-aware
+default, producing the same compact JSON either way.
+
+compact_export() turns a pathway export into the compact response shape: every
+distinct course is listed once in a top-level "courses" table and nodes refer
+to it by position, instead of repeating the full course dicts under each skill.
+
+compress() negotiates Accept-Encoding: brotli when the brotli package is
+installed and the client accepts it, otherwise gzip.
+"""
+import gzip
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# smaller bodies are not worth the CPU (or the extra round of headers)
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _course_key(course):
+    return (course.get("course_prefix"), course.get("course_number"), course.get("course_title"), course.get("course_desc"))
+
+
+def compact_export(export):
+    """Export with courses moved into a shared table, nodes keep "courses" as table positions.
+
+    Courses are deduplicated by prefix, number, title and description rather than
+    by object identity, since a pathway read back from the disk cache holds a
+    fresh dict for every reference to the same course.
+    """
+    table = []
+    positions = {}
+    nodes = []
+    for node in export["nodes"]:
+        if node.get("courses"):
+            refs = []
+            for course in node["courses"]:
+                key = _course_key(course)
+                position = positions.get(key)
+                if position is None:
+                    position = positions[key] = len(table)
+                    table.append(course)
+                refs.append(position)
+            node = {**node, "courses": refs}
+        nodes.append(node)
+    return {"nodes": nodes, "edges": export["edges"], "courses": table}
+
+
+def accepted_encodings(accept_encoding):
+    """Content codings the client accepts (q > 0), from an Accept-Encoding header."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(body, accept_encoding):
+    """Returns (body, content coding or None)."""
+    if len(body) < MIN_COMPRESS_SIZE or not accept_encoding:
+        return body, None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted or "*" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
@@ -0,0 +1,108 @@
+"""FAISS index over the skill embeddings.
+
+The pathway finds a job's skills by inner-product search over
+skill_embeddings2.npy. An exact IndexFlatIP is the default and is plenty for
+the current 8,648 skills; for larger RSD collections an approximate index can be
+selected instead:
+
+    flat  exact search (the baseline)
+    ivf   IndexIVFFlat, nprobe of nlist inverted lists are scanned per query
+    hnsw  IndexHNSWFlat, ef_search controls the search breadth
+
+An index is built once and saved next to the data with faiss.write_index
+(skill_index.<kind>.faiss); it is rebuilt when skill_embeddings2.npy is newer
+than the saved file or the skill count changed. Search-time parameters are not
+part of the file and are applied on every open.
+
+With mmap=True the saved file is memory-mapped (faiss.IO_FLAG_MMAP_IFC) rather
+than read, so the vectors of a flat or HNSW index are shared between worker
+processes; faiss builds without the flag read the file as usual.
+
+See `python benchmark.py --mode index` for recall against flat vs latency.
+"""
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 128
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+
+
+def index_path(data_dir, kind):
+    return os.path.join(data_dir, f"skill_index.{kind}.faiss")
+
+
+def default_nlist(count):
+    # the usual ~4*sqrt(n) lists, at least 39 training points per list
+    return max(1, min(int(4 * np.sqrt(count)), count // 39))
+
+
+def build_skill_index(embeddings, kind="flat", nlist=None):
+    """Build an inner-product index of the given type over the embedding rows."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    dim = embeddings.shape[1]
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "ivf":
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist or default_nlist(len(embeddings)), faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        raise ValueError(f"Unknown skill index type: {kind} (expected one of {', '.join(INDEX_TYPES)})")
+    index.add(embeddings)
+    return index
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    """Apply search-time parameters, a no-op for the flat index."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe or DEFAULT_NPROBE
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search or DEFAULT_EF_SEARCH
+    return index
+
+
+def describe(index):
+    """Short description of the index and its search parameters, e.g. "ivf nlist=371 nprobe=16"."""
+    if isinstance(index, faiss.IndexIVF):
+        return f"ivf nlist={index.nlist} nprobe={index.nprobe}"
+    if isinstance(index, faiss.IndexHNSW):
+        return f"hnsw M={HNSW_M} efSearch={index.hnsw.efSearch}"
+    return "flat"
+
+
+def open_skill_index(data_dir, embeddings, embeddings_path=None, kind="flat", nprobe=None, ef_search=None, mmap=False):
+    """Load the saved index of this type, or build and save it if it is missing or stale."""
+    path = index_path(data_dir, kind)
+    io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) if mmap else 0
+    index = None
+    try:
+        stale = embeddings_path is not None and os.path.getmtime(embeddings_path) > os.path.getmtime(path)
+        if not stale:
+            index = faiss.read_index(path, io_flags)
+            if index.ntotal != len(embeddings) or index.d != embeddings.shape[1]:
+                index = None
+    except (OSError, RuntimeError):
+        # missing or unreadable, faiss reports I/O errors as RuntimeError
+        index = None
+
+    if index is None:
+        index = build_skill_index(embeddings, kind)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, path)
+            if io_flags:
+                index = faiss.read_index(path, io_flags)
+        except (OSError, RuntimeError):
+            # read-only data directory, keep the in-memory index
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return configure_search(index, nprobe, ef_search)
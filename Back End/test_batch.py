@@ -0,0 +1,56 @@
+"""POST /pathways keeps streaming the other pairs when one group fails.
+
+Runs against a stand-in catalog and stubbed worker entry points, so it needs
+neither the data files nor the model:
+
+    cd "Back End" && python -m pytest -q test_batch.py
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import main
+
+JOBS = ["General and Operations Managers", "Software Developers", "Chemists"]
+
+
+def _search_jobs_sync(version, job_rows):
+    return np.tile(np.arange(300), (len(job_rows), 1)), {}
+
+
+def _get_pathways_sync(version, job1Index, skill_hits, current_skill_hits):
+    if JOBS[job1Index] == "Software Developers":
+        # finish after the good group, so its line is already written
+        time.sleep(0.2)
+        raise RuntimeError("tree assembly failed")
+    return [{"nodes": [], "edges": []} for _ in current_skill_hits], {}
+
+
+def _run_batch(monkeypatch, pairs):
+    catalog = SimpleNamespace(job_index={job: row for row, job in enumerate(JOBS)}, version="test-batch")
+    monkeypatch.setattr(main, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(main, "_search_jobs_sync", _search_jobs_sync)
+    monkeypatch.setattr(main, "_get_pathways_sync", _get_pathways_sync)
+
+    async def collect():
+        return [json.loads(line) async for line in main._stream_pathways(pairs)]
+
+    try:
+        return asyncio.run(collect())
+    finally:
+        main.shutdown_pool()
+
+
+def test_failing_group_does_not_cut_off_the_batch(monkeypatch):
+    lines = _run_batch(monkeypatch, [
+        ("General and Operations Managers", "Chemists"),
+        ("Software Developers", "Chemists"),
+    ])
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == [0, 1]
+    assert by_index[0]["status"] == 200
+    assert by_index[1]["status"] == 500
+    assert by_index[1]["error"] == "tree assembly failed"
@@ -0,0 +1,90 @@
+"""Job-to-job transition affinities for "nearest next roles".
+
+Comparing one occupation's skills with every other occupation's used to mean a
+full pathway run per pair. Instead, every row of job_embeddings.npy is searched
+against the skill index in one matrix query, and each occupation's top
+TRANSITION_SKILLS skills (the same depth /pathway uses to mark a current job's
+matches) are kept as one row of a bitset. Skills are compared by name, so
+repeated skillOrder names share a bit.
+
+From the bitsets, shared[a, b] is the number of skills occupations a and b
+have in common. The affinity of moving from a to b is shared[a, b] / |b|, the
+share of b's skills that a already has. The TRANSITION_TOP_N best targets of
+every occupation are sorted once, so /transitions/{job} is a row lookup.
+
+The table is saved to job_transitions.npz (python compile_data.py transitions)
+and rebuilt when the catalog version it was computed for changes.
+"""
+import os
+
+import numpy as np
+
+TRANSITIONS_FILE = "job_transitions.npz"
+TRANSITION_SKILLS = 100
+TRANSITION_TOP_N = 50
+
+
+def job_skill_bits(catalog, k=TRANSITION_SKILLS):
+    """Packed (jobs, ceil(skills / 8)) bitset of every occupation's top k skills."""
+    _, hits = catalog.skill_search_index.search(catalog.job_embeddings, k)
+    # first skillOrder row of each name, so a name is one bit
+    canonical = np.array([catalog.skill_index[skill] for skill in catalog.skills], dtype=np.int64)
+    rows = np.repeat(np.arange(len(hits)), hits.shape[1])
+    hits = hits.ravel()
+    valid = hits >= 0  # approximate indexes may pad with -1
+    skill_sets = np.zeros((len(catalog.job_embeddings), len(catalog.skills)), dtype=bool)
+    skill_sets[rows[valid], canonical[hits[valid]]] = True
+    return np.packbits(skill_sets, axis=1)
+
+
+class JobTransitions:
+    def __init__(self, skill_bits, skill_count, top_n=TRANSITION_TOP_N, version=None):
+        """skill_bits from job_skill_bits(), skill_count is the number of skillOrder rows."""
+        self.version = version
+        self.skill_bits = skill_bits
+        skill_sets = np.unpackbits(skill_bits, axis=1, count=skill_count).astype(np.float32)
+        self.skill_counts = skill_sets.sum(axis=1).astype(np.int32)
+        # |a & b| for every pair in one product; counts are at most TRANSITION_SKILLS
+        self.shared = (skill_sets @ skill_sets.T).astype(np.uint16)
+        affinity = self.shared / np.maximum(self.skill_counts, 1)[np.newaxis, :]
+        np.fill_diagonal(affinity, -1.0)
+        # best affinity first, more shared skills break ties
+        order = np.lexsort((-self.shared, -affinity), axis=1)
+        self.targets = order[:, :min(top_n, len(order) - 1)].astype(np.int32)
+        self.affinity = np.take_along_axis(affinity, self.targets, axis=1).astype(np.float32)
+
+    @classmethod
+    def compute(cls, catalog, top_n=TRANSITION_TOP_N):
+        return cls(job_skill_bits(catalog), len(catalog.skills), top_n, catalog.version)
+
+    @classmethod
+    def open_or_compile(cls, path, catalog):
+        """The table saved at path if it was computed for this catalog version, otherwise computed and saved."""
+        try:
+            with np.load(path) as saved:
+                if str(saved["version"]) == catalog.version and saved["skill_bits"].shape[0] == len(catalog.jobs):
+                    return cls(saved["skill_bits"], len(catalog.skills), int(saved["top_n"]), catalog.version)
+        except (OSError, KeyError, ValueError):
+            pass
+        transitions = cls.compute(catalog)
+        transitions.save(path)
+        return transitions
+
+    def save(self, path):
+        """Write the bitsets atomically, returns False if they could not be written."""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp_path, skill_bits=self.skill_bits, top_n=self.targets.shape[1], version=self.version)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def nearest(self, job_idx, n=10):
+        """[(target job row, affinity, shared skills, missing skills)] for the n most reachable roles."""
+        targets = self.targets[job_idx][:n]
+        shared = self.shared[job_idx, targets]
+        missing = self.skill_counts[targets] - shared
+        return list(zip(targets.tolist(), self.affinity[job_idx][:n].tolist(), shared.tolist(), missing.tolist()))
@@ -0,0 +1,62 @@
+"""Shared, bounded pool for the heavy pathway computations.
+
+One long-lived executor is created at startup instead of a new
+ThreadPoolExecutor per request. At most `workers + max_queue` computations are
+admitted at a time; beyond that callers get Overloaded straight away (the API
+turns it into a 503 with Retry-After) instead of queueing more CPU work behind
+requests that are already late.
+
+mode="process" runs the work in a ProcessPoolExecutor so the graph and ranking
+stages are not serialized on the GIL. The function and its arguments must then
+be picklable (a module-level function and plain values).
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Raised when the pool already has as many computations as it admits."""
+
+
+class WorkerPool:
+    def __init__(self, workers, max_queue, mode="thread", initializer=None):
+        if mode == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+        elif mode == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pathway")
+        else:
+            raise ValueError(f"Unknown worker pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        # only touched from the event loop thread, so no lock needed
+        self.pending = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_queue
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool, or raise Overloaded if it is full."""
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise Overloaded()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self, cancel_pending=True):
+        """Stop the pool without waiting; cancel_pending=False lets queued work still run."""
+        self.executor.shutdown(wait=False, cancel_futures=cancel_pending)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
@@ -26,6 +26,29 @@ export const getAvailableJobs = async () => {
   }
 };
 
+/**
+ * Search job titles on the server (typeahead), best matches first
+ * @param {string} query - What the user has typed so far
+ * @param {number} limit - Max results to return
+ * @returns {Promise<Array>} Array of {title, code, score}
+ */
+export const searchJobs = async (query, limit = 10) => {
+  try {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    const response = await fetch(`${API_BASE_URL}/jobs/search?${params}`);
+
+    if (!response.ok) {
+      throw new Error(`Failed to search jobs: ${response.status} ${response.statusText}`);
+    }
+
+    const data = await response.json();
+    return data.results || [];
+  } catch (error) {
+    console.error('Error searching jobs:', error);
+    return [];
+  }
+};
+
 /**
  * Fetch the skill pathway data from the backend
  * @param {string} job1 - Current/starting job title
@@ -55,6 +78,64 @@ export const getPathway = async (job1, job2) => {
   }
 };
 
+/**
+ * Stream the skill pathway tier by tier (root + foundational first, then medium,
+ * niche and applied_hard), so the graph can start rendering before it is complete
+ * @param {string} job1 - Current/starting job title
+ * @param {string} job2 - Dream/goal job title
+ * @param {Function} onTier - Called with {tier, nodes, edges} for each tier as it arrives
+ * @returns {Promise<Object>} The full pathway data with nodes and edges, once complete
+ * @throws {Error} If the request fails
+ */
+export const streamPathway = async (job1, job2, onTier) => {
+  try {
+    const encodedJob1 = encodeURIComponent(job1);
+    const encodedJob2 = encodeURIComponent(job2);
+
+    const response = await fetch(
+      `${API_BASE_URL}/pathway/${encodedJob1}/${encodedJob2}/stream`
+    );
+
+    if (!response.ok) {
+      throw new Error(`Failed to fetch pathway: ${response.status} ${response.statusText}`);
+    }
+
+    const pathway = { nodes: [], edges: [] };
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    // newline-delimited JSON, one record per line
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const record = JSON.parse(line);
+      if (record.type === 'error') {
+        throw new Error(record.error);
+      }
+      if (record.type === 'tier') {
+        pathway.nodes.push(...record.nodes);
+        pathway.edges.push(...record.edges);
+        onTier?.(record);
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+
+    return pathway;
+  } catch (error) {
+    console.error('Error streaming pathway:', error);
+    throw error;
+  }
+};
+
 /**
  * Health check - verify the backend is running
  * @returns {Promise<boolean>} True if backend is accessible